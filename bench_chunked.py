@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pathlib import Path
+
+import bench_interp
+import resample_freq
+import seek_index
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print(
+            "Usage: python bench_chunked.py [seconds] [columns] [interpolation_method] [max_workers] [repeats]"
+        )
+        print("Example: python bench_chunked.py 36000 9 linear 8 3")
+        sys.exit(0)
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3600.0
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    method = sys.argv[3] if len(sys.argv) > 3 else "linear"
+    max_workers = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count() or 1
+    repeats = int(sys.argv[5]) if len(sys.argv) > 5 else 3
+
+    # 100 Hz sensor resampled to a 30 Hz camera clock, end to end from the
+    # sensor CSV: parsing is most of the work
+    source_timestamps, source_values, target_timestamps, _ = (
+        bench_interp.synthetic_signal(seconds, 100.0, 30.0, columns)
+    )
+    time_col = "time_ms_loc"
+    value_cols = [f"v{col}" for col in range(columns)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_csv = Path(tmp_dir) / "sensor.csv"
+        with source_csv.open("w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow([time_col] + value_cols)
+            writer.writerows(
+                [timestamp, *values]
+                for timestamp, values in zip(source_timestamps, source_values)
+            )
+
+        # Built once per file and kept next to it, not part of the timings
+        start = time.perf_counter()
+        seek_index.load_index(source_csv, time_col=time_col)
+        index_time = time.perf_counter() - start
+
+        print(
+            f"{len(source_timestamps)} source samples x {columns} columns "
+            f"-> {len(target_timestamps)} targets, {method}, best of {repeats}, "
+            f"{os.cpu_count()} CPUs, index built in {index_time:.4f} s"
+        )
+        print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8}")
+
+        # workers=1 is the serial path, the reference for the output and the
+        # speedup
+        reference = None
+        reference_time = None
+        mismatches = 0
+        counts = sorted(
+            {min(2**k, max_workers) for k in range(max_workers.bit_length() + 1)}
+        )
+        for workers in counts:
+            resampled, _, _ = resample_freq.resample_csv_chunked(
+                source_csv, target_timestamps, time_col, value_cols, method, workers
+            )
+            elapsed = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                resample_freq.resample_csv_chunked(
+                    source_csv, target_timestamps, time_col, value_cols, method, workers
+                )
+                elapsed = min(elapsed, time.perf_counter() - start)
+
+            if reference is None:
+                reference = resampled
+                reference_time = elapsed
+            elif not np.array_equal(reference, resampled, equal_nan=True):
+                mismatches += 1
+                print(f"{workers} workers do not match the serial result")
+
+            print(f"{workers:>8} {elapsed:>10.4f} {reference_time / elapsed:>7.2f}x")
+
+    sys.exit(1 if mismatches else 0)
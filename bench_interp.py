@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+
+import numpy as np
+
+from typing import Callable, Tuple
+
+import resample_freq
+
+
+def synthetic_signal(
+    seconds: float,
+    source_rate_hz: float,
+    target_rate_hz: float,
+    columns: int,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Callable[[np.ndarray], np.ndarray]]:
+    rng = np.random.default_rng(seed)
+
+    # Jittered sensor clock in ms, camera-like target clock
+    period_ms = 1000.0 / source_rate_hz
+    n = int(seconds * source_rate_hz)
+    source_timestamps = np.cumsum(rng.uniform(0.5, 1.5, n) * period_ms)
+    target_timestamps = np.arange(
+        source_timestamps[0], source_timestamps[-1], 1000.0 / target_rate_hz
+    )
+
+    # A few gait-like harmonics per column
+    freqs_hz = rng.uniform(0.5, 8.0, (3, columns))
+    phases = rng.uniform(0.0, 2.0 * np.pi, (3, columns))
+
+    def truth(t: np.ndarray) -> np.ndarray:
+        s = t[:, None] / 1000.0
+        return sum(
+            np.sin(2.0 * np.pi * freqs_hz[h] * s + phases[h]) / (h + 1)
+            for h in range(3)
+        )
+
+    return source_timestamps, truth(source_timestamps), target_timestamps, truth
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print(
+            "Usage: python bench_interp.py [seconds] [columns] [source_rate_hz] [target_rate_hz] [repeats]"
+        )
+        print("Example: python bench_interp.py 3600 9 100 30 5")
+        sys.exit(0)
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    source_rate_hz = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+    target_rate_hz = float(sys.argv[4]) if len(sys.argv) > 4 else 30.0
+    repeats = int(sys.argv[5]) if len(sys.argv) > 5 else 5
+
+    source_timestamps, source_values, target_timestamps, truth = synthetic_signal(
+        seconds, source_rate_hz, target_rate_hz, columns
+    )
+    expected = truth(target_timestamps)
+
+    print(
+        f"{len(source_timestamps)} source samples x {columns} columns "
+        f"-> {len(target_timestamps)} targets, best of {repeats}"
+    )
+    print(
+        f"{'method':<12} {'time (s)':>10} {'speedup':>8} {'max err':>10} {'rms err':>10}"
+    )
+
+    reference_time = None
+    for method in ("cubic", "linear") + resample_freq.LOCAL_KERNELS:
+        # First call warms up caches and lazy imports, keep it out of the timing
+        resampled = resample_freq.resample_values(
+            source_timestamps, source_values, target_timestamps, method
+        )
+        elapsed = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            resample_freq.resample_values(
+                source_timestamps, source_values, target_timestamps, method
+            )
+            elapsed = min(elapsed, time.perf_counter() - start)
+        if reference_time is None:
+            reference_time = elapsed
+
+        error = resampled - expected
+        print(
+            f"{method:<12} {elapsed:>10.4f} {reference_time / elapsed:>7.1f}x "
+            f"{np.nanmax(np.abs(error)):>10.2e} {np.sqrt(np.nanmean(error**2)):>10.2e}"
+        )
+
+    sys.exit(0)
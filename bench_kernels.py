@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+
+import numpy as np
+
+from typing import Callable, Dict, Tuple
+
+import kernels
+
+
+def synthetic_workloads(size: int, seed: int = 0) -> Dict[str, Tuple[Callable, tuple]]:
+    rng = np.random.default_rng(seed)
+
+    # ~30 Hz camera clock in ms with a few dropped frames
+    camera = 1_700_000_000_000 + np.cumsum(
+        rng.choice([33, 34, 33, 80, 120], size, p=[0.45, 0.45, 0.06, 0.03, 0.01])
+    )
+
+    # IMU clock with repeated timestamps and a few NaN values
+    imu = np.sort(rng.integers(camera[0], camera[-1], size))
+    imu_values = rng.normal(size=(size, 9)).astype(np.float32)
+    imu_values[rng.random(imu_values.shape) < 0.001] = np.nan
+
+    # Source samples at ~100 Hz searched for ~30 Hz targets
+    source = np.sort(rng.uniform(camera[0], camera[-1], size)).astype(np.float64)
+    targets = np.sort(rng.uniform(camera[0], camera[-1], size // 3))
+
+    return {
+        "fill_gaps": (kernels.fill_gaps, (camera, 40.0)),
+        "dedup_mean": (kernels.dedup_mean, (imu, imu_values)),
+        "bracket": (kernels.bracket, (source, targets)),
+    }
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(_same(x, y) for x, y in zip(a, b))
+    return a.dtype == b.dtype and np.array_equal(a, b, equal_nan=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print("Usage: python bench_kernels.py [size] [repeats]")
+        print("Example: python bench_kernels.py 1000000 5")
+        sys.exit(0)
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    workloads = synthetic_workloads(size)
+    backends = kernels.available_backends()
+
+    # The first call in a process includes loading (or compiling) the JIT
+    # backend, it is reported next to the best of the following calls
+    print(f"{size} samples, first call and best of {repeats}")
+    print(
+        f"{'kernel':<12}"
+        + "".join(f"{backend:>12}{backend + ' 1st':>12}" for backend in backends)
+    )
+
+    mismatches = 0
+    for name, (kernel, args) in workloads.items():
+        timings = []
+        reference = None
+        for backend in backends:
+            kernels.set_backend(backend)
+            start = time.perf_counter()
+            result = kernel(*args)
+            first = time.perf_counter() - start
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                kernel(*args)
+                best = min(best, time.perf_counter() - start)
+            timings += [best, first]
+
+            if reference is None:
+                reference = result
+            elif not _same(reference, result):
+                mismatches += 1
+                print(f"{name}: {backend} does not match {backends[0]}")
+
+        print(f"{name:<12}" + "".join(f"{t * 1000:>10.2f}ms" for t in timings))
+
+    sys.exit(1 if mismatches else 0)
@@ -2,14 +2,44 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import math
 
+import numpy as np
+
+from typing import Iterable, Optional
 from pathlib import Path
 
+# Compact mode: integer millisecond timestamps, single precision sensor values
+# and 32 bit frame indices
+TIME_DTYPE = np.int64
+VALUE_DTYPE = np.float32
+INDEX_DTYPE = np.int32
 
-def open_csv(file_path: Path) -> csv.DictReader:
+
+def check_csv(file_path: Path) -> None:
     if not file_path.exists():
         raise FileNotFoundError(f"File {file_path} does not exist.")
     if not file_path.is_file():
         raise IsADirectoryError(f"{file_path} is a directory, not a file.")
 
+
+def open_csv(file_path: Path) -> csv.DictReader:
+    check_csv(file_path)
+
     return csv.DictReader(file_path.open("r", encoding="utf-8"))
+
+
+def to_float(value: Optional[str]) -> float:
+    # Same as pd.to_numeric(..., errors="coerce")
+    try:
+        return float(value)  # type: ignore
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def to_timestamps(values: Iterable[str], compact: bool = False) -> np.ndarray:
+    timestamps = np.array([float(value) for value in values])
+    if compact:
+        return np.rint(timestamps).astype(TIME_DTYPE)
+
+    return timestamps
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import tempfile
+
+import numpy as np
+
+from typing import List
+from pathlib import Path
+
+import main
+import resample_freq
+
+
+def precision_report(
+    camera_csv: Path,
+    data_csv: Path,
+    time_col: str,
+    data_cols: List[str],
+    interpolation_method: str = "linear",
+) -> dict:
+    # Runs the camera filling and the resampling in float64 and in compact mode
+    # and measures how far the compact results are from the float64 ones
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for compact in (False, True):
+            target_timestamps = main.fill_camera(
+                camera_csv, time_col, Path(tmp_dir) / f"cam_{compact}.csv", compact
+            )
+            source_timestamps, source_values = main.load_source(
+                data_csv, time_col, data_cols, compact
+            )
+            resampled_values = resample_freq.resample_values(
+                source_timestamps,
+                source_values,
+                target_timestamps,
+                interpolation_method,
+            )
+            results[compact] = (
+                target_timestamps,
+                source_timestamps,
+                source_values,
+                resampled_values,
+            )
+
+    reference, compact = results[False], results[True]
+    report = {
+        "target_rows": len(reference[0]),
+        "compact_target_rows": len(compact[0]),
+        "source_rows": len(reference[1]),
+        "compact_source_rows": len(compact[1]),
+        "bytes": sum(array.nbytes for array in reference),
+        "compact_bytes": sum(array.nbytes for array in compact),
+    }
+
+    # Deviations are only defined row by row, they are left out when compact
+    # mode changed the number of rows
+    if len(reference[1]) == len(compact[1]):
+        report["source_time_max_dev_ms"] = float(
+            np.max(np.abs(compact[1] - reference[1]), initial=0.0)
+        )
+        report["source_value_max_dev"] = dict(
+            zip(
+                data_cols,
+                np.nanmax(
+                    np.abs(compact[2].astype(np.float64) - reference[2]), axis=0
+                ).tolist(),
+            )
+        )
+
+    if len(reference[0]) == len(compact[0]):
+        deviation = np.abs(compact[3].astype(np.float64) - reference[3])
+        scale = np.nanmax(np.abs(reference[3]), axis=0)
+        report["target_time_max_dev_ms"] = float(
+            np.max(np.abs(compact[0] - reference[0]), initial=0.0)
+        )
+        report["value_max_dev"] = dict(
+            zip(data_cols, np.nanmax(deviation, axis=0).tolist())
+        )
+        report["value_max_rel_dev"] = dict(
+            zip(data_cols, (np.nanmax(deviation, axis=0) / scale).tolist())
+        )
+        report["nan_mismatch"] = int(
+            np.count_nonzero(np.isnan(compact[3]) != np.isnan(reference[3]))
+        )
+
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 5:
+        print(
+            "Usage: compact_report.py <camera_csv> <data_csv> <time_col> <data_cols> [interpolation_method]"
+        )
+        print(
+            "Example: compact_report.py timestamp_1080_1_sync.csv imu_0_data_sync.csv time_ms_loc ax,ay,az"
+        )
+        sys.exit(1)
+
+    report = precision_report(
+        Path(sys.argv[1]),
+        Path(sys.argv[2]),
+        sys.argv[3],
+        sys.argv[4].split(","),
+        interpolation_method=sys.argv[5] if len(sys.argv) > 5 else "linear",
+    )
+
+    for name in ("target", "source"):
+        rows = report[f"{name}_rows"]
+        compact_rows = report[f"compact_{name}_rows"]
+        if rows != compact_rows:
+            print(f"{name.capitalize()} rows: {rows} -> {compact_rows} in compact mode")
+
+    if "target_time_max_dev_ms" in report:
+        print(f"Target timestamps max deviation: {report['target_time_max_dev_ms']} ms")
+    if "source_time_max_dev_ms" in report:
+        print(f"Source timestamps max deviation: {report['source_time_max_dev_ms']} ms")
+        for col, dev in report["source_value_max_dev"].items():
+            print(f"{col}: source max dev {dev:.3e}")
+    if "value_max_dev" in report:
+        for col in report["value_max_dev"]:
+            print(
+                f"{col}: resampled max dev {report['value_max_dev'][col]:.3e} "
+                f"(relative {report['value_max_rel_dev'][col]:.3e})"
+            )
+        print(f"NaN mismatches: {report['nan_mismatch']}")
+    print(
+        f"Memory: {report['bytes']} bytes -> {report['compact_bytes']} bytes "
+        f"({report['compact_bytes'] / report['bytes']:.2f}x)"
+    )
+    sys.exit(0)
@@ -3,33 +3,54 @@
 
 import csv
 
+import numpy as np
+
+from typing import List, Tuple
+
+import common
+import kernels
+
+
+def fill_cam_rows(
+    camera_rows: List[dict], time_col: str, gap_threshold_ms: float
+) -> Tuple[List[dict], np.ndarray]:
+    # Ideally it should be 1 / 30 Hz = 33.33 ms
+    # If the gap is larger than the threshold, we fill it with the last row's
+    # timestamp incremented by half the gap size. The gaps are found by
+    # kernels.fill_gaps, rows are only copied where one is filled. Returns the
+    # filled rows and their timestamps.
+    timestamps = common.to_timestamps(row[time_col] for row in camera_rows)
+    filled_timestamps, filled_frames = kernels.fill_gaps(timestamps, gap_threshold_ms)
 
-def fill_cam_gaps(csv: csv.DictReader, time_col: str, gap_threshold_ms: float) -> list:
     filled_rows = []
-    last_row = None
+    last_frame = -1
+    for timestamp, frame in zip(filled_timestamps.tolist(), filled_frames.tolist()):
+        if frame == last_frame:
+            filled_rows.append({**camera_rows[frame], time_col: str(int(timestamp))})
+        else:
+            filled_rows.append(camera_rows[frame])
+        last_frame = frame
 
-    for row in csv:
-        if last_row is not None:
-            delta = float(row[time_col]) - float(last_row[time_col])
-            # Ideally it should be 1 / 30 Hz = 33.33 ms
-            # If the gap is larger than the threshold, we fill it with the last row's
-            # timestamp incremented by half the gap size
-            if delta > gap_threshold_ms:
-                last_row_copy = last_row.copy()
-                last_row_copy[time_col] = str(int(float(last_row[time_col]) + delta / 2.0))
-                filled_rows.append(last_row_copy)
-        filled_rows.append(row)
-        last_row = row
+    return filled_rows, filled_timestamps
 
-    return filled_rows
+
+def fill_cam_gaps(csv: csv.DictReader, time_col: str, gap_threshold_ms: float) -> list:
+    return fill_cam_rows(list(csv), time_col, gap_threshold_ms)[0]
+
+
+def fill_cam_gaps_compact(
+    timestamps: np.ndarray, gap_threshold_ms: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Same filling as fill_cam_gaps, on int64 millisecond timestamps. Returns the
+    # filled timestamps and, for every filled row, the index of the camera frame
+    # it comes from, so the other columns never need to be copied.
+    return kernels.fill_gaps(timestamps, gap_threshold_ms)
 
 
 if __name__ == "__main__":
     import sys
     import csv
 
-    import common
-
     from pathlib import Path
 
     if len(sys.argv) < 4:
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import common
+import seek_index
 import sys
 
 import numpy as np
@@ -11,7 +12,7 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 
 if len(sys.argv) < 4:
-    print("Usage: fourier.py <file> <columns> <rate> <resampling_rate>")
+    print("Usage: fourier.py <file> <columns> <rate> <resampling_rate> [start:end]")
     print("Example: fourier.py data.csv x,y,z 100")
     sys.exit(1)
 
@@ -19,9 +20,13 @@ file = Path(sys.argv[1])
 cols = sys.argv[2].split(",")
 rate = sys.argv[3]
 resampling_rate = float(sys.argv[4])
-csv = common.open_csv(file)
-
-rows = list(csv)
+if len(sys.argv) > 5:
+    # Only the requested rows are parsed
+    start, end = map(int, sys.argv[5].split(":"))
+    rows = seek_index.read_rows(file, start, end)
+else:
+    csv = common.open_csv(file)
+    rows = list(csv)
 
 
 def plot_fft(signal, sample_rate_hz, aliasing_start):
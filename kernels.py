@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import warnings
+
+import numpy as np
+
+from types import SimpleNamespace
+from typing import Dict, Tuple
+
+import common
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Hot loops of the pipeline, implemented once with plain NumPy and, when numba
+# is installed, once as JIT-compiled loops. Both backends give identical
+# results, the backend is picked with MALGAIT_KERNELS or set_backend().
+# numba is the default when it is installed. The loops are compiled once and
+# cached on disk, but every process still pays a few hundred ms on its first
+# call to load numba (see the first-call columns of bench_kernels.py),
+# MALGAIT_KERNELS=numpy avoids it for short single-file runs.
+
+
+def _fill_gaps_numpy(
+    timestamps: np.ndarray, gap_threshold_ms: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    delta = np.diff(timestamps)
+    gaps = np.flatnonzero(delta > gap_threshold_ms)
+    frames = np.arange(len(timestamps), dtype=common.INDEX_DTYPE)
+
+    # Truncated like int() in fill_cam.fill_cam_gaps, exact on int64 ms
+    midpoints = np.trunc(timestamps[gaps] + delta[gaps] / 2.0)
+    filled_timestamps = np.insert(
+        timestamps, gaps + 1, midpoints.astype(timestamps.dtype)
+    )
+    filled_frames = np.insert(frames, gaps + 1, frames[gaps])
+
+    return filled_timestamps, filled_frames
+
+
+def _dedup_mean_numpy(
+    timestamps: np.ndarray, values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    n, c = values.shape
+    first = np.ones(n, dtype=bool)
+    first[1:] = timestamps[1:] != timestamps[:-1]
+    starts = np.flatnonzero(first)
+    sizes = np.diff(np.append(starts, n))
+    valid = ~np.isnan(values)
+
+    # Most timestamps are unique, their mean is the value itself (0.0 + value,
+    # like the JIT loop, so -0.0 comes out as 0.0)
+    means = np.where(valid[starts], values[starts].astype(np.float64) + 0.0, np.nan)
+
+    # Repeated timestamps are summed one position of the group at a time, in
+    # row order and with the same compensated summation as the JIT loop
+    repeated = sizes > 1
+    if repeated.any():
+        group_starts = starts[repeated]
+        group_sizes = sizes[repeated]
+        sums = np.zeros((len(group_starts), c))
+        compensation = np.zeros((len(group_starts), c))
+        counts = np.zeros((len(group_starts), c), dtype=np.int64)
+        # inf - inf is NaN on purpose, the error term is reset below
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for k in range(group_sizes.max()):
+                live = np.flatnonzero(group_sizes > k)
+                rows = group_starts[live] + k
+                value = values[rows].astype(np.float64)
+                added = valid[rows]
+                total = sums[live]
+                y = value - compensation[live]
+                t = total + y
+                error = (t - total) - y
+                error[np.isnan(error)] = 0.0
+                sums[live] = np.where(added, t, total)
+                compensation[live] = np.where(added, error, compensation[live])
+                counts[live] += added
+            means[repeated] = np.where(counts > 0, sums / counts, np.nan)
+
+    return timestamps[starts], means
+
+
+def _bracket_numpy(x: np.ndarray, t: np.ndarray) -> np.ndarray:
+    return np.searchsorted(x, t, side="right")
+
+
+_BACKENDS: Dict[str, SimpleNamespace] = {
+    "numpy": SimpleNamespace(
+        fill_gaps=_fill_gaps_numpy,
+        dedup_mean=_dedup_mean_numpy,
+        bracket=_bracket_numpy,
+    )
+}
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _fill_gaps_loop(timestamps, gap_threshold_ms, frame_dtype):
+        n = len(timestamps)
+        gaps = 0
+        for i in range(1, n):
+            if timestamps[i] - timestamps[i - 1] > gap_threshold_ms:
+                gaps += 1
+
+        filled_timestamps = np.empty(n + gaps, dtype=timestamps.dtype)
+        filled_frames = np.empty(n + gaps, dtype=frame_dtype)
+        j = 0
+        for i in range(n):
+            if i > 0:
+                delta = timestamps[i] - timestamps[i - 1]
+                if delta > gap_threshold_ms:
+                    filled_timestamps[j] = np.trunc(timestamps[i - 1] + delta / 2.0)
+                    filled_frames[j] = i - 1
+                    j += 1
+            filled_timestamps[j] = timestamps[i]
+            filled_frames[j] = i
+            j += 1
+
+        return filled_timestamps, filled_frames
+
+    @numba.njit(cache=True)
+    def _dedup_mean_loop(timestamps, values):
+        n, c = values.shape
+        groups = 0
+        for i in range(n):
+            if i == 0 or timestamps[i] != timestamps[i - 1]:
+                groups += 1
+
+        unique_timestamps = np.empty(groups, dtype=timestamps.dtype)
+        means = np.empty((groups, c))
+        start = 0
+        for g in range(groups):
+            end = start + 1
+            while end < n and timestamps[end] == timestamps[start]:
+                end += 1
+            unique_timestamps[g] = timestamps[start]
+
+            for k in range(c):
+                # Kahan summation, like pandas' groupby mean
+                total = 0.0
+                compensation = 0.0
+                count = 0
+                for i in range(start, end):
+                    value = values[i, k]
+                    if not np.isnan(value):
+                        y = np.float64(value) - compensation
+                        t = total + y
+                        error = (t - total) - y
+                        # An infinite value makes the error NaN, not the sum
+                        compensation = 0.0 if np.isnan(error) else error
+                        total = t
+                        count += 1
+                means[g, k] = total / count if count else np.nan
+            start = end
+
+        return unique_timestamps, means
+
+    @numba.njit(cache=True)
+    def _bracket_loop(x, t):
+        # Same as np.searchsorted(x, t, side="right")
+        indices = np.empty(len(t), dtype=np.int64)
+
+        # Sorted targets (the usual case) are a single merge-like walk, NaNs
+        # count as unsorted
+        walk = True
+        for i in range(1, len(t)):
+            if not t[i] >= t[i - 1]:
+                walk = False
+                break
+
+        lo = 0
+        for i in range(len(t)):
+            if walk:
+                while lo < len(x) and x[lo] <= t[i]:
+                    lo += 1
+                indices[i] = lo
+                continue
+
+            lo = 0
+            hi = len(x)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if t[i] < x[mid]:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            indices[i] = lo
+
+        return indices
+
+    def _fill_gaps_numba(
+        timestamps: np.ndarray, gap_threshold_ms: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return _fill_gaps_loop(timestamps, gap_threshold_ms, common.INDEX_DTYPE)
+
+    def _dedup_mean_numba(
+        timestamps: np.ndarray, values: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return _dedup_mean_loop(timestamps, np.ascontiguousarray(values))
+
+    def _bracket_numba(x: np.ndarray, t: np.ndarray) -> np.ndarray:
+        return _bracket_loop(x, t)
+
+    _BACKENDS["numba"] = SimpleNamespace(
+        fill_gaps=_fill_gaps_numba,
+        dedup_mean=_dedup_mean_numba,
+        bracket=_bracket_numba,
+    )
+
+
+def available_backends() -> Tuple[str, ...]:
+    return tuple(_BACKENDS)
+
+
+def set_backend(name: str) -> None:
+    global _backend, _backend_name
+
+    if name not in _BACKENDS:
+        raise ValueError(
+            f"Kernel backend {name!r} is not available, "
+            f"expected one of {', '.join(_BACKENDS)}."
+        )
+    _backend = _BACKENDS[name]
+    _backend_name = name
+
+
+def get_backend() -> str:
+    return _backend_name
+
+
+def fill_gaps(
+    timestamps: np.ndarray, gap_threshold_ms: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Filled timestamps and the index of the frame each filled row repeats
+    return _backend.fill_gaps(timestamps, gap_threshold_ms)
+
+
+def dedup_mean(
+    timestamps: np.ndarray, values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Sorted timestamps in, unique timestamps and NaN-skipping float64 means
+    # out, summed like pandas' groupby mean so the results are identical
+    return _backend.dedup_mean(timestamps, values)
+
+
+def bracket(x: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # np.searchsorted(x, t, side="right") on a sorted x
+    return _backend.bracket(x, t)
+
+
+def warm_up() -> None:
+    # Compiles (or loads from the cache) every kernel of the current backend.
+    # Called before starting worker processes: forked workers inherit the
+    # compiled loops instead of each paying the first-call cost.
+    timestamps = np.array([0.0, 1.0, 1.0, 50.0])
+    fill_gaps(timestamps, 40.0)
+    fill_gaps(timestamps.astype(common.TIME_DTYPE), 40.0)
+    dedup_mean(timestamps, np.zeros((4, 1)))
+    dedup_mean(timestamps.astype(common.TIME_DTYPE), np.zeros((4, 1), np.float32))
+    bracket(timestamps, timestamps)
+    bracket(timestamps.astype(common.TIME_DTYPE), timestamps.astype(common.TIME_DTYPE))
+
+
+def _default_backend() -> str:
+    name = os.environ.get("MALGAIT_KERNELS")
+    if name is None:
+        return "numba" if "numba" in _BACKENDS else "numpy"
+
+    if name not in _BACKENDS:
+        # A missing optional dependency must not break the import
+        warnings.warn(
+            f"Kernel backend {name!r} from MALGAIT_KERNELS is not available, "
+            f"using numpy (available: {', '.join(_BACKENDS)})."
+        )
+        return "numpy"
+
+    return name
+
+
+_backend = _BACKENDS["numpy"]
+_backend_name = "numpy"
+set_backend(_default_backend())
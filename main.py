@@ -4,22 +4,29 @@
 import sys
 import csv
 import pandas as pd
+import numpy as np
 import os
 
+from typing import Dict, List, Tuple
 from pathlib import Path
-from multiprocessing import Pool
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import resample_freq
 import resample_sensor
 import common
 import fill_cam
+import kernels
+import shared_arrays
 
 
-def fill_proc(camera_csv, data_csv, time_col, data_cols, output_cam_csv , output_data_csv, interpolation_method):
-    temp_csv = None
+def fill_camera(camera_csv, time_col, output_cam_csv, compact=False) -> np.ndarray:
+    if compact:
+        return fill_camera_compact(camera_csv, time_col, output_cam_csv)
+
     # Fill gaps in camera data
-    filled_camera_rows = fill_cam.fill_cam_gaps(
-        common.open_csv(camera_csv),
+    filled_camera_rows, filled_timestamps = fill_cam.fill_cam_rows(
+        list(common.open_csv(camera_csv)),
         time_col,
         gap_threshold_ms=40.0,
     )
@@ -34,61 +41,213 @@ def fill_proc(camera_csv, data_csv, time_col, data_cols, output_cam_csv , output
         for filled_row in filled_camera_rows:
             writer.writerow(filled_row)
 
-    # If the target CSV is an IMU, remove duplicates
-    if "imu" in data_csv.stem.lower():
-        target_freq_hz = 60.0
+    return filled_timestamps
+
 
-        resampled_data = resample_sensor.remove_sensor_duplicates(
-            common.open_csv(data_csv),
-            time_col,
+def fill_camera_compact(camera_csv, time_col, output_cam_csv) -> np.ndarray:
+    camera_rows = list(common.open_csv(camera_csv))
+    timestamps = common.to_timestamps(
+        (row[time_col] for row in camera_rows), compact=True
+    )
+
+    # Fill gaps in camera data, filled rows only keep the index of their frame
+    filled_timestamps, filled_frames = fill_cam.fill_cam_gaps_compact(
+        timestamps, gap_threshold_ms=40.0
+    )
+
+    # Write filled camera data to output CSV
+    output_cam_csv.parent.mkdir(parents=True, exist_ok=True)
+
+    with output_cam_csv.open("w", newline="", encoding="utf-8") as csvfile:
+        fieldnames = camera_rows[0].keys()
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for timestamp, frame in zip(filled_timestamps, filled_frames):
+            writer.writerow({**camera_rows[frame], time_col: timestamp})
+
+    return filled_timestamps
+
+
+def load_source(data_csv, time_col, data_cols, compact=False) -> Tuple[np.ndarray, np.ndarray]:
+    # If the source CSV is an IMU, remove duplicates
+    if "imu" in data_csv.stem.lower():
+        source = resample_sensor.read_sensor(
+            common.open_csv(data_csv), time_col, data_cols
         )
+        if compact:
+            return resample_sensor.remove_sensor_duplicates_compact(*source)
+        return resample_sensor.merge_sensor_duplicates(*source)
 
-        # Write resampled data to output CSV
-        temp_csv = output_data_csv.with_suffix(".temp.csv")
-        temp_csv.parent.mkdir(parents=True, exist_ok=True)
-        with temp_csv.open("w", newline="", encoding="utf-8") as csvfile:
-            fieldnames = resampled_data[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(resampled_data)
+    return resample_freq.read_signal(
+        common.open_csv(data_csv), time_col, data_cols, compact
+    )
 
-        data_csv = temp_csv  # Update data_csv to the resampled output
 
-    # Resample sensor data based on filled camera timestamps
+def write_resampled(output_data_csv, time_col, data_cols, values, timestamps):
     output_data_csv.parent.mkdir(parents=True, exist_ok=True)
     with output_data_csv.open("w", newline="", encoding="utf-8") as csvfile:
         fieldnames = [time_col] + data_cols
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
 
-        for resampled_values, target_timestamps in zip(
-            *resample_freq.resample_signal_from_csv(
-                common.open_csv(data_csv),
-                common.open_csv(output_cam_csv),
-                source_time_col=time_col,
-                source_value_cols=data_cols,
-                target_time_col=time_col,
-                interpolation_method=interpolation_method,
-            )
-        ):
+        for resampled_values, target_timestamps in zip(values, timestamps):
             row = {time_col: target_timestamps}
             for col, value in zip(data_cols, resampled_values):
                 row[col] = value
             writer.writerow(row)
 
-    if "imu" in data_csv.stem.lower():
-        temp_csv.unlink() # type: ignore
-
-def run_parallel_fill_proc():
-    args = [
-        (global_path / videos[0], global_path_save / names[0], starts[0], ends[0]),
-        (global_path / videos[1], global_path_save / names[1], starts[0], ends[0]),
-        (global_path / videos[2], global_path_save / names[2], starts[1], ends[1]),
-        (global_path / videos[3], global_path_save / names[3], starts[1], ends[1]),
-    ]
-
-    with Pool(processes = 4) as pool:
-        pool.starmap(fill_proc, args)
+
+def fill_proc(camera_csv, data_csv, time_col, data_cols, output_cam_csv , output_data_csv, interpolation_method, compact=False):
+    target_timestamps = fill_camera(camera_csv, time_col, output_cam_csv, compact)
+    source_timestamps, source_values = load_source(
+        data_csv, time_col, data_cols, compact
+    )
+
+    # Resample sensor data based on filled camera timestamps
+    resampled_values = resample_freq.resample_values(
+        source_timestamps, source_values, target_timestamps, interpolation_method
+    )
+    write_resampled(
+        output_data_csv, time_col, data_cols, resampled_values, target_timestamps
+    )
+
+
+def resample_proc(target_ref, source_refs, data_csv, time_col, data_cols, output_data_csv, interpolation_method, compact=False):
+    # Attach to the camera timeline filled once by the parent, no copy is made
+    target_timestamps, target_segment = shared_arrays.attach(target_ref)
+    segments = [target_segment]
+
+    try:
+        if source_refs is None:
+            # Source only used by this job, loaded here rather than in the parent
+            source_timestamps, source_values = load_source(
+                data_csv, time_col, data_cols, compact
+            )
+        else:
+            source_timestamps, source_timestamps_segment = shared_arrays.attach(source_refs[0])
+            source_values, source_values_segment = shared_arrays.attach(source_refs[1])
+            segments += [source_timestamps_segment, source_values_segment]
+
+        resampled_values = resample_freq.resample_values(
+            source_timestamps, source_values, target_timestamps, interpolation_method
+        )
+        write_resampled(
+            output_data_csv, time_col, data_cols, resampled_values, target_timestamps
+        )
+    finally:
+        # Views must be gone before the segments can be closed
+        target_timestamps = source_timestamps = source_values = None
+        for segment in segments:
+            segment.close()
+
+
+def fill_camera_shared(camera_csv, time_col, output_cam_csv, compact=False) -> Tuple[shared_arrays.SharedArrayRef]:
+    # fill_camera in a worker, the timeline is handed back in shared memory
+    return (
+        shared_arrays.create(
+            fill_camera(camera_csv, time_col, output_cam_csv, compact)
+        ),
+    )
+
+
+def load_source_shared(data_csv, time_col, data_cols, compact=False) -> Tuple[shared_arrays.SharedArrayRef, shared_arrays.SharedArrayRef]:
+    # load_source in a worker, the arrays are handed back in shared memory
+    source_timestamps, source_values = load_source(
+        data_csv, time_col, data_cols, compact
+    )
+    return (
+        shared_arrays.create(source_timestamps),
+        shared_arrays.create(source_values),
+    )
+
+
+def _adopt_made(shared, futures) -> None:
+    # Segments made by the workers that succeeded belong to the batch even
+    # when another worker failed, they are unlinked with it. Adopting a
+    # segment twice is a no-op.
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            for ref in future.result():
+                shared.adopt(ref)
+
+
+def run_parallel_fill_proc(
+    cameras: Dict[str, Tuple[Path, Path]],
+    sources: Dict[str, Tuple[Path, List[str]]],
+    jobs: List[Tuple[str, str, Path]],
+    time_col: str,
+    interpolation_method: str = "linear",
+    processes: int = 4,
+    compact: bool = False,
+):
+    # cameras: name -> (camera_csv, output_cam_csv)
+    # sources: name -> (data_csv, data_cols)
+    # jobs: (camera name, source name, output_data_csv)
+    #
+    # Camera timelines are filled once, in parallel, and shared with every job
+    # using them. A source used by a single job is loaded by that job's worker,
+    # a source used by several jobs is loaded once, in parallel with the
+    # cameras, and shared as well. Timelines and shared sources are written to
+    # shared memory by the worker making them, the parent only adopts the
+    # segments.
+    uses = Counter(source_name for _, source_name, _ in jobs)
+
+    camera_futures = {}
+    source_futures = {}
+    with shared_arrays.SharedArrays() as shared:
+        # Forked workers inherit the compiled kernels
+        kernels.warm_up()
+
+        try:
+            # Unlike Pool, the executor notices a worker that died and raises
+            # instead of hanging, so the segments are always released
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                camera_futures = {
+                    name: executor.submit(
+                        fill_camera_shared, camera_csv, time_col, output_cam_csv, compact
+                    )
+                    for name, (camera_csv, output_cam_csv) in cameras.items()
+                }
+                source_futures = {
+                    name: executor.submit(
+                        load_source_shared, data_csv, time_col, data_cols, compact
+                    )
+                    for name, (data_csv, data_cols) in sources.items()
+                    if uses[name] > 1
+                }
+
+                camera_refs = {
+                    name: shared.adopt(future.result()[0])
+                    for name, future in camera_futures.items()
+                }
+
+                def submit(camera_name, source_name, output_data_csv, source_refs):
+                    data_csv, data_cols = sources[source_name]
+                    return executor.submit(
+                        resample_proc,
+                        camera_refs[camera_name],
+                        source_refs,
+                        data_csv,
+                        time_col,
+                        data_cols,
+                        output_data_csv,
+                        interpolation_method,
+                        compact,
+                    )
+
+                # Jobs loading their own source can start right away
+                futures = [
+                    submit(*job, None) for job in jobs if job[1] not in source_futures
+                ]
+
+                for name, future in source_futures.items():
+                    source_refs = tuple(shared.adopt(ref) for ref in future.result())
+                    futures += [submit(*job, source_refs) for job in jobs if job[1] == name]
+
+                for future in futures:
+                    future.result()
+        finally:
+            _adopt_made(shared, [*camera_futures.values(), *source_futures.values()])
 
 if __name__=="__main__":
 
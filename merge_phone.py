@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+import heapq
+import math
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+
+import common
+
+# (timestamp, timestamp as written in the file, column -> value)
+Sample = Tuple[float, str, Dict[str, float]]
+
+
+def value_cols(csv_reader: csv.DictReader, time_col: str) -> List[str]:
+    return [col for col in csv_reader.fieldnames or [] if col != time_col]
+
+
+def deduplicated_samples(csv_reader: csv.DictReader, time_col: str) -> Iterator[Sample]:
+    # Streaming version of resample_sensor.remove_sensor_duplicates: rows
+    # sharing a timestamp are averaged column by column, ignoring NaNs, and
+    # rows without a valid timestamp are dropped. Only works on time-ordered
+    # files, which lets it keep a single group in memory.
+    cols = value_cols(csv_reader, time_col)
+
+    group_time = None
+    group_text = ""
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+
+    for row in csv_reader:
+        timestamp = common.to_float(row[time_col])
+        if math.isnan(timestamp):
+            continue
+
+        if timestamp != group_time:
+            if group_time is not None:
+                if timestamp < group_time:
+                    raise ValueError(
+                        f"Timestamps are not sorted: {row[time_col]} after {group_text}."
+                    )
+                yield group_time, group_text, {
+                    col: sums[col] / counts[col] if counts[col] else math.nan
+                    for col in cols
+                }
+            group_time = timestamp
+            group_text = row[time_col]
+            sums = dict.fromkeys(cols, 0.0)
+            counts = dict.fromkeys(cols, 0)
+
+        for col in cols:
+            value = common.to_float(row[col])
+            if not math.isnan(value):
+                sums[col] += value
+                counts[col] += 1
+
+    if group_time is not None:
+        yield group_time, group_text, {
+            col: sums[col] / counts[col] if counts[col] else math.nan for col in cols
+        }
+
+
+def file_value_cols(sensor_csv: Path, time_col: str) -> List[str]:
+    # Header only, the file is closed right away
+    common.check_csv(sensor_csv)
+    with sensor_csv.open("r", encoding="utf-8") as csv_file:
+        return value_cols(csv.DictReader(csv_file), time_col)
+
+
+def _sensor_samples(sensor_csv: Path, time_col: str) -> Iterator[Sample]:
+    # The file is closed once the samples are exhausted or the generator is
+    # closed
+    with sensor_csv.open("r", encoding="utf-8") as csv_file:
+        yield from deduplicated_samples(csv.DictReader(csv_file), time_col)
+
+
+def _prefixed_cols(sensor_csvs: List[Path], time_col: str) -> List[List[str]]:
+    # Sensors share column names (x, y, z), prefix them with the file name
+    return [
+        [f"{sensor_csv.stem}_{col}" for col in file_value_cols(sensor_csv, time_col)]
+        for sensor_csv in sensor_csvs
+    ]
+
+
+def _open_sensors(
+    sensor_csvs: List[Path], time_col: str
+) -> Tuple[List[Iterator[Sample]], List[List[str]]]:
+    prefixed_cols = _prefixed_cols(sensor_csvs, time_col)
+    streams = [_sensor_samples(sensor_csv, time_col) for sensor_csv in sensor_csvs]
+
+    return streams, prefixed_cols
+
+
+def _close(streams: List[Iterator[Sample]]) -> None:
+    for stream in streams:
+        stream.close()  # type: ignore
+
+
+def _tag(
+    stream: Iterator[Sample], cols: List[str]
+) -> Iterator[Tuple[float, str, Dict[str, float], List[str]]]:
+    # A function rather than a generator expression, so each stream keeps its
+    # own column names instead of the last one of the loop
+    for timestamp, text, values in stream:
+        yield timestamp, text, values, cols
+
+
+def merge_sensor_files(sensor_csvs: List[Path], time_col: str) -> Iterator[dict]:
+    # k-way merge of the per-sensor files into a single time-ordered table.
+    # Sensors without a sample at a given timestamp are left empty.
+    streams, prefixed_cols = _open_sensors(sensor_csvs, time_col)
+
+    tagged = [_tag(stream, cols) for stream, cols in zip(streams, prefixed_cols)]
+
+    try:
+        row: dict = {}
+        row_time = None
+        for timestamp, text, values, cols in heapq.merge(*tagged, key=lambda s: s[0]):
+            if timestamp != row_time:
+                if row_time is not None:
+                    yield row
+                row = {time_col: text}
+                row_time = timestamp
+            row.update(zip(cols, values.values()))
+
+        if row_time is not None:
+            yield row
+    finally:
+        _close(streams)
+
+
+def resample_sensor_files(
+    sensor_csvs: List[Path],
+    time_col: str,
+    target_timestamps: Iterable[float],
+) -> Iterator[dict]:
+    # Linear interpolation of every sensor onto a shared, sorted timeline in a
+    # single pass over all files. NaN outside each sensor's time range, like
+    # resample_freq.resample_signal_from_csv.
+    streams, prefixed_cols = _open_sensors(sensor_csvs, time_col)
+    previous: List[Optional[Sample]] = [None] * len(streams)
+
+    try:
+        upcoming = [next(stream, None) for stream in streams]
+        last_target = -math.inf
+        for target in target_timestamps:
+            if target < last_target:
+                raise ValueError(f"Target timestamps are not sorted: {target}.")
+            last_target = target
+
+            row = {time_col: target}
+            for s, (stream, cols) in enumerate(zip(streams, prefixed_cols)):
+                while upcoming[s] is not None and upcoming[s][0] < target:  # type: ignore
+                    previous[s] = upcoming[s]
+                    upcoming[s] = next(stream, None)
+
+                lo, hi = previous[s], upcoming[s]
+                if hi is None or (lo is None and hi[0] != target):
+                    row.update(dict.fromkeys(cols, math.nan))
+                elif lo is None:
+                    # Exactly on the first sample
+                    row.update(zip(cols, hi[2].values()))
+                else:
+                    # Same arithmetic as interp1d, for identical results
+                    dt = hi[0] - lo[0]
+                    row.update(
+                        (col, (y_hi - y_lo) / dt * (target - lo[0]) + y_lo)
+                        for col, y_lo, y_hi in zip(cols, lo[2].values(), hi[2].values())
+                    )
+            yield row
+    finally:
+        _close(streams)
+
+
+def sensor_fieldnames(sensor_csvs: List[Path], time_col: str) -> List[str]:
+    return [time_col] + [
+        col for cols in _prefixed_cols(sensor_csvs, time_col) for col in cols
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 4:
+        print("Usage: merge_phone.py <phone_dir> <time_col> <output_csv> [target_csv]")
+        print("Example: merge_phone.py Sensor_Logger time_ms_loc phone.csv")
+        print(
+            "Example: merge_phone.py User_Phone time_ms_loc phone.csv timestamp_1080_1_sync_fill.csv"
+        )
+        sys.exit(1)
+
+    phone_dir = Path(sys.argv[1])
+    time_col = sys.argv[2]
+    output_csv = Path(sys.argv[3])
+    target_csv = Path(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    sensor_csvs = sorted(phone_dir.glob("*.csv"))
+    if not sensor_csvs:
+        print(f"No CSV files in {phone_dir}")
+        sys.exit(1)
+
+    if target_csv is None:
+        rows = merge_sensor_files(sensor_csvs, time_col)
+    else:
+        common.check_csv(target_csv)
+        with target_csv.open("r", encoding="utf-8") as target_file:
+            target_timestamps = [
+                float(row[time_col]) for row in csv.DictReader(target_file)
+            ]
+        rows = resample_sensor_files(sensor_csvs, time_col, target_timestamps)
+
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    with output_csv.open("w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(
+            csvfile, fieldnames=sensor_fieldnames(sensor_csvs, time_col)
+        )
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"Merged data written to {output_csv}")
+    sys.exit(0)
@@ -18,7 +18,7 @@ from scipy.signal import find_peaks
 
 from pathlib import Path
 
-import common
+import seek_index
 
 
 def butter_lowpass_filter(
@@ -42,17 +42,15 @@ if __name__ == "__main__":
         )
         sys.exit(1)
 
-    left_data_csv = common.open_csv(Path(sys.argv[1]))
-    right_data_csv = common.open_csv(Path(sys.argv[2]))
+    left_data_csv = Path(sys.argv[1])
+    right_data_csv = Path(sys.argv[2])
     freq = float(sys.argv[3])
     col = sys.argv[4]
     start, end = map(int, sys.argv[5].split(":"))
 
-    left_data_rows = list(left_data_csv)
-    right_data_rows = list(right_data_csv)
-
-    left_data_rows = left_data_rows[start:end]
-    right_data_rows = right_data_rows[start:end]
+    # Only the requested frames are parsed
+    left_data_rows = seek_index.read_rows(left_data_csv, start, end)
+    right_data_rows = seek_index.read_rows(right_data_csv, start, end)
 
     time = np.arange(len(left_data_rows)) / freq  # Time axis in seconds
 
@@ -9,18 +9,25 @@ import numpy as np
 from pathlib import Path
 
 import common
+import seek_index
 
 if len(sys.argv) < 4:
-    print("Usage: plot.py <file> <sample_rate> <cols>")
+    print("Usage: plot.py <file> <sample_rate> <cols> [start:end]")
     print("Example: plot.py data.csv 100 x,y,z")
+    print("Example: plot.py data.csv 100 x,y,z 6000:12000")
     sys.exit(1)
 
 
 file = Path(sys.argv[1])
 sample_rate = int(sys.argv[2])
 cols = sys.argv[3].split(",")
-csv = common.open_csv(file)
-rows = list(csv)
+if len(sys.argv) > 4:
+    # Only the requested rows are parsed
+    start, end = map(int, sys.argv[4].split(":"))
+    rows = seek_index.read_rows(file, start, end)
+else:
+    csv = common.open_csv(file)
+    rows = list(csv)
 
 t = np.arange(len(rows)) / sample_rate  # Time axis in seconds
 
@@ -0,0 +1,773 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+
+import common
+import fill_cam
+import kernels
+import main
+import merge_phone
+import regress_baseline
+import resample_freq
+import resample_sensor
+
+# Output-equivalence and throughput harness. Every stage runs the reference
+# implementation (frozen in regress_baseline.py) and the faster engines on the
+# same inputs, checks that the outputs agree within tolerance and records the
+# speedup and the peak memory ratio of each engine. Exits non-zero when an
+# engine disagrees with the reference or got slower / hungrier than in a saved
+# baseline.
+
+Stage = Callable[[dict, Path], Tuple[np.ndarray, ...]]
+
+# (stage, engine name, function(inputs, work_dir) returning comparable arrays,
+# whether the engine works in compact precision, whether it runs in this
+# process). tracemalloc only sees this process, engines using subprocesses
+# get no memory ratio.
+Engine = Tuple[str, str, Stage, bool, bool]
+
+
+def synthetic_inputs(out_dir: Path, seconds: float, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+
+    def write(path: Path, fieldnames: List[str], rows) -> Path:
+        with path.open("w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writer.writerows(rows)
+        return path
+
+    # ~30 Hz camera with dropped frames
+    frames = int(seconds * 30)
+    camera = 1_700_000_000_000 + np.cumsum(
+        rng.choice([33, 34, 80, 120], frames, p=[0.48, 0.48, 0.03, 0.01])
+    )
+    camera_csv = write(
+        out_dir / "timestamp_1080_1_sync.csv",
+        ["frame", "time_ms_loc"],
+        ((frame, timestamp) for frame, timestamp in enumerate(camera)),
+    )
+
+    # ~100 Hz IMU with repeated timestamps, starting before the camera
+    samples = int(seconds * 100)
+    imu = np.sort(rng.integers(camera[0] - 500, camera[-1] + 500, samples))
+    imu_values = rng.normal(size=(samples, 9)).round(6)
+    imu_cols = ["wx", "wy", "wz", "ax", "ay", "az", "gx", "gy", "gz"]
+    imu_csv = write(
+        out_dir / "imu_0_data_sync.csv",
+        ["time_ms_loc"] + imu_cols,
+        ([t, *values] for t, values in zip(imu, imu_values)),
+    )
+
+    # ~200 Hz phone gyroscope on whole milliseconds (like our time_ms_loc
+    # columns, compact mode rounds to them) with a long dropout
+    samples = int(seconds * 200)
+    gyroscope = np.unique(rng.integers(camera[0], camera[-1], samples))
+    gyroscope = gyroscope[
+        (gyroscope < camera[len(camera) // 2])
+        | (gyroscope > camera[len(camera) // 2] + 2000)
+    ]
+    gyroscope_values = rng.normal(size=(len(gyroscope), 3)).round(6)
+    gyroscope_csv = write(
+        out_dir / "Gyroscope_sync.csv",
+        ["time_ms_loc", "z", "y", "x"],
+        ([t, *values] for t, values in zip(gyroscope, gyroscope_values)),
+    )
+
+    # ~100 Hz phone accelerometer on its own clock, sharing some timestamps
+    # with the gyroscope and logging a few of them twice
+    samples = int(seconds * 100)
+    accelerometer = np.sort(
+        np.concatenate(
+            [
+                rng.integers(camera[0], camera[-1], samples),
+                rng.choice(gyroscope, samples // 10),
+            ]
+        )
+    )
+    accelerometer_values = rng.normal(size=(len(accelerometer), 3)).round(6)
+    accelerometer_csv = write(
+        out_dir / "Accelerometer_sync.csv",
+        ["time_ms_loc", "z", "y", "x"],
+        ([t, *values] for t, values in zip(accelerometer, accelerometer_values)),
+    )
+
+    # ~800 Hz phone sensor on fractional milliseconds: once rounded to whole
+    # ms (compact mode) neighbouring samples often share a timestamp
+    samples = int(seconds * 800)
+    gravity = np.sort(rng.uniform(camera[0], camera[-1], samples)).round(3)
+    gravity_values = rng.normal(size=(samples, 3)).round(6)
+    gravity_csv = write(
+        out_dir / "Gravity_sync.csv",
+        ["time_ms_loc", "z", "y", "x"],
+        ([t, *values] for t, values in zip(gravity, gravity_values)),
+    )
+
+    return {
+        "camera_csv": camera_csv,
+        "imu_csv": imu_csv,
+        "imu_cols": imu_cols,
+        "sensor_csv": gyroscope_csv,
+        "sensor_cols": ["z", "y", "x"],
+        "phone_csvs": [accelerometer_csv, gyroscope_csv],
+        "fractional_csv": gravity_csv,
+        "time_col": "time_ms_loc",
+    }
+
+
+def read_output(output_csv: Path, cols: List[str]) -> Tuple[np.ndarray, ...]:
+    rows = list(common.open_csv(output_csv))
+    return tuple(np.array([float(row[col]) for row in rows]) for col in cols)
+
+
+def _rows_to_arrays(rows: List[dict], time_col: str, cols: List[str]):
+    return (
+        np.array([float(row[time_col]) for row in rows]),
+        np.array([[float(row[col]) for col in cols] for row in rows]).reshape(
+            len(rows), len(cols)
+        ),
+    )
+
+
+# Stages: reference implementations
+
+
+def fill_reference(inputs: dict, work_dir: Path):
+    rows = regress_baseline.fill_cam_gaps(
+        regress_baseline.open_csv(inputs["camera_csv"]), inputs["time_col"], 40.0
+    )
+    return _rows_to_arrays(rows, inputs["time_col"], ["frame"])
+
+
+def dedup_reference(inputs: dict, work_dir: Path):
+    rows = regress_baseline.remove_sensor_duplicates(
+        regress_baseline.open_csv(inputs["imu_csv"]), inputs["time_col"]
+    )
+    return _rows_to_arrays(rows, inputs["time_col"], inputs["imu_cols"])
+
+
+def resample_reference(inputs: dict, work_dir: Path):
+    values, timestamps = regress_baseline.resample_signal_from_csv(
+        regress_baseline.open_csv(inputs["sensor_csv"]),
+        regress_baseline.open_csv(inputs["camera_csv"]),
+        inputs["time_col"],
+        inputs["sensor_cols"],
+        inputs["time_col"],
+    )
+    return timestamps, values
+
+
+def rounded_reference(inputs: dict, work_dir: Path):
+    # Float64 resampling of the fractional ms sensor once its timestamps are
+    # rounded to whole ms, samples sharing a ms averaged like duplicates
+    time_col = inputs["time_col"]
+    rows = list(regress_baseline.open_csv(inputs["fractional_csv"]))
+    for row in rows:
+        row[time_col] = np.rint(float(row[time_col]))
+    values, timestamps = regress_baseline.resample_signal_from_csv(
+        iter(regress_baseline.remove_sensor_duplicates(iter(rows), time_col)),
+        regress_baseline.open_csv(inputs["camera_csv"]),
+        time_col,
+        inputs["sensor_cols"],
+        time_col,
+    )
+    return timestamps, values
+
+
+def gaps_reference(inputs: dict, work_dir: Path):
+    # Resampled values, NaN for targets outside the source or inside a
+    # dropout longer than max_gap_ms (unless they fall exactly on a sample)
+    timestamps, values = resample_reference(inputs, work_dir)
+    source = np.sort(
+        [
+            float(row[inputs["time_col"]])
+            for row in regress_baseline.open_csv(inputs["sensor_csv"])
+        ]
+    )
+
+    following = np.searchsorted(source, timestamps, side="left")
+    on_sample = source[np.minimum(following, len(source) - 1)] == timestamps
+    inside = (timestamps >= source[0]) & (timestamps <= source[-1])
+    dropout = np.zeros(len(timestamps), dtype=bool)
+    dropout[inside] = (
+        source[following[inside]] - source[np.maximum(following[inside] - 1, 0)]
+        > inputs["max_gap_ms"]
+    )
+
+    values = values.copy()
+    values[~inside | (dropout & ~on_sample)] = np.nan
+    return timestamps, values
+
+
+def _phone_cols(inputs: dict) -> List[Tuple[Path, List[str]]]:
+    return [
+        (
+            phone_csv,
+            [
+                col
+                for col in regress_baseline.open_csv(phone_csv).fieldnames or []
+                if col != inputs["time_col"]
+            ],
+        )
+        for phone_csv in inputs["phone_csvs"]
+    ]
+
+
+def phone_resample_reference(inputs: dict, work_dir: Path):
+    # Every phone sensor deduplicated and resampled on its own, side by side
+    time_col = inputs["time_col"]
+    columns = []
+    for phone_csv, cols in _phone_cols(inputs):
+        rows = regress_baseline.remove_sensor_duplicates(
+            regress_baseline.open_csv(phone_csv), time_col
+        )
+        values, timestamps = regress_baseline.resample_signal_from_csv(
+            iter(rows),
+            regress_baseline.open_csv(inputs["camera_csv"]),
+            time_col,
+            cols,
+            time_col,
+        )
+        columns.append(values)
+    return timestamps, np.hstack(columns)
+
+
+def phone_merge_reference(inputs: dict, work_dir: Path):
+    # Outer join of the deduplicated phone sensors on the timestamp
+    time_col = inputs["time_col"]
+    frames = []
+    for phone_csv, cols in _phone_cols(inputs):
+        rows = regress_baseline.remove_sensor_duplicates(
+            regress_baseline.open_csv(phone_csv), time_col
+        )
+        frame = pd.DataFrame(rows, columns=[time_col] + cols).set_index(time_col)
+        frames.append(frame.add_prefix(f"{phone_csv.stem}_"))
+    merged = pd.concat(frames, axis=1, join="outer").sort_index()
+    return merged.index.to_numpy(dtype=float), merged.to_numpy(dtype=float)
+
+
+def _run_pipe(inputs: dict, work_dir: Path, name: str, pipe: Callable, **kwargs):
+    output_cam_csv = work_dir / name / "cam.csv"
+    output_data_csv = work_dir / name / "imu.csv"
+    pipe(
+        inputs["camera_csv"],
+        inputs["imu_csv"],
+        inputs["time_col"],
+        inputs["imu_cols"],
+        output_cam_csv,
+        output_data_csv,
+        "linear",
+        **kwargs,
+    )
+    return read_output(output_cam_csv, [inputs["time_col"], "frame"]) + read_output(
+        output_data_csv, [inputs["time_col"]] + inputs["imu_cols"]
+    )
+
+
+def pipeline_reference(inputs: dict, work_dir: Path):
+    # In this process, like the engines, so that start-up is left out of both
+    return _run_pipe(inputs, work_dir, "pipe", regress_baseline.pipe)
+
+
+# Stages: engines
+
+
+def _fill_rows(inputs: dict, work_dir: Path):
+    rows = fill_cam.fill_cam_gaps(
+        common.open_csv(inputs["camera_csv"]), inputs["time_col"], 40.0
+    )
+    return _rows_to_arrays(rows, inputs["time_col"], ["frame"])
+
+
+def _fill_compact(inputs: dict, work_dir: Path):
+    rows = list(common.open_csv(inputs["camera_csv"]))
+    timestamps = common.to_timestamps(
+        (row[inputs["time_col"]] for row in rows), compact=True
+    )
+    filled_timestamps, filled_frames = fill_cam.fill_cam_gaps_compact(timestamps, 40.0)
+    frames = np.array([float(row["frame"]) for row in rows])
+    return filled_timestamps, frames[filled_frames][:, None]
+
+
+def _dedup_arrays(inputs: dict, work_dir: Path):
+    return resample_sensor.merge_sensor_duplicates(
+        *resample_sensor.read_sensor(
+            common.open_csv(inputs["imu_csv"]),
+            inputs["time_col"],
+            inputs["imu_cols"],
+        )
+    )
+
+
+def _dedup_compact(inputs: dict, work_dir: Path):
+    return resample_sensor.remove_sensor_duplicates_compact(
+        *resample_sensor.read_sensor(
+            common.open_csv(inputs["imu_csv"]),
+            inputs["time_col"],
+            inputs["imu_cols"],
+        )
+    )
+
+
+def _dedup_streaming(inputs: dict, work_dir: Path):
+    samples = list(
+        merge_phone.deduplicated_samples(
+            common.open_csv(inputs["imu_csv"]), inputs["time_col"]
+        )
+    )
+    return (
+        np.array([timestamp for timestamp, _, _ in samples]),
+        np.array(
+            [[values[col] for col in inputs["imu_cols"]] for _, _, values in samples]
+        ),
+    )
+
+
+def _with_backend(backend: str, func: Callable) -> Callable:
+    def run(inputs: dict, work_dir: Path):
+        previous = kernels.get_backend()
+        kernels.set_backend(backend)
+        try:
+            return func(inputs, work_dir)
+        finally:
+            kernels.set_backend(previous)
+
+    return run
+
+
+def _resample_with(source: str = "sensor_csv", **kwargs):
+    def run(inputs: dict, work_dir: Path):
+        values, timestamps = resample_freq.resample_signal_from_csv(
+            common.open_csv(inputs[source]),
+            common.open_csv(inputs["camera_csv"]),
+            inputs["time_col"],
+            inputs["sensor_cols"],
+            inputs["time_col"],
+            **kwargs,
+        )
+        return timestamps, values
+
+    return run
+
+
+def _resample_gaps(inputs: dict, work_dir: Path):
+    values, timestamps = resample_freq.resample_signal_from_csv(
+        common.open_csv(inputs["sensor_csv"]),
+        common.open_csv(inputs["camera_csv"]),
+        inputs["time_col"],
+        inputs["sensor_cols"],
+        inputs["time_col"],
+        max_gap_ms=inputs["max_gap_ms"],
+    )
+    return timestamps, values
+
+
+def _resample_chunked(workers: int, gaps: bool = False):
+    # Every worker parses its own part of the sensor file
+    def run(inputs: dict, work_dir: Path):
+        timestamps = resample_freq.read_timestamps(
+            common.open_csv(inputs["camera_csv"]), inputs["time_col"]
+        )
+        values, valid, _ = resample_freq.resample_csv_chunked(
+            inputs["sensor_csv"],
+            timestamps,
+            inputs["time_col"],
+            inputs["sensor_cols"],
+            workers=workers,
+            max_gap_ms=inputs["max_gap_ms"] if gaps else None,
+        )
+        return timestamps, values
+
+    return run
+
+
+def _phone_resample_streaming(inputs: dict, work_dir: Path):
+    time_col = inputs["time_col"]
+    targets = resample_freq.read_timestamps(
+        common.open_csv(inputs["camera_csv"]), time_col
+    )
+    cols = inputs["phone_cols"]
+    rows = merge_phone.resample_sensor_files(inputs["phone_csvs"], time_col, targets)
+    return targets, np.array([[row[col] for col in cols] for row in rows])
+
+
+def _phone_merge_streaming(inputs: dict, work_dir: Path):
+    time_col = inputs["time_col"]
+    cols = inputs["phone_cols"]
+    rows = list(merge_phone.merge_sensor_files(inputs["phone_csvs"], time_col))
+    return (
+        np.array([float(row[time_col]) for row in rows]),
+        np.array([[row.get(col, np.nan) for col in cols] for row in rows]),
+    )
+
+
+def _fill_proc(inputs: dict, work_dir: Path):
+    return _run_pipe(inputs, work_dir, "fill_proc", main.fill_proc)
+
+
+def _fill_proc_compact(inputs: dict, work_dir: Path):
+    return _run_pipe(inputs, work_dir, "compact", main.fill_proc, compact=True)
+
+
+def _shared_batch(processes: int):
+    # A small batch covering both kinds of sources: "imu" is used by two jobs
+    # and shared by the parent, "imu_solo" (the same file) is loaded by its
+    # worker. Every job resamples the same data, the outputs must be identical.
+    # Timed per job (see BATCH_JOBS), against the one job of the reference.
+    def run(inputs: dict, work_dir: Path):
+        out_dir = work_dir / "shared"
+        time_col = inputs["time_col"]
+        main.run_parallel_fill_proc(
+            {
+                "zed_1": (inputs["camera_csv"], out_dir / "cam_1.csv"),
+                "zed_2": (inputs["camera_csv"], out_dir / "cam_2.csv"),
+            },
+            {
+                "imu": (inputs["imu_csv"], inputs["imu_cols"]),
+                "imu_solo": (inputs["imu_csv"], inputs["imu_cols"]),
+            },
+            [
+                ("zed_1", "imu", out_dir / "imu_1.csv"),
+                ("zed_2", "imu", out_dir / "imu_2.csv"),
+                ("zed_2", "imu_solo", out_dir / "imu_solo.csv"),
+            ],
+            time_col,
+            processes=processes,
+        )
+
+        expected = (out_dir / "imu_1.csv").read_bytes()
+        for name in ("imu_2.csv", "imu_solo.csv"):
+            if (out_dir / name).read_bytes() != expected:
+                raise RuntimeError(f"{name} differs from imu_1.csv in the batch.")
+
+        return read_output(out_dir / "cam_1.csv", [time_col, "frame"]) + read_output(
+            out_dir / "imu_1.csv", [time_col] + inputs["imu_cols"]
+        )
+
+    return run
+
+
+# stage -> (reference, whether it runs in this process)
+REFERENCES: Dict[str, Tuple[Stage, bool]] = {
+    "fill_cam": (fill_reference, True),
+    "resample_sensor": (dedup_reference, True),
+    "resample_freq": (resample_reference, True),
+    "resample_rounded": (rounded_reference, True),
+    "resample_gaps": (gaps_reference, True),
+    "phone_resample": (phone_resample_reference, True),
+    "phone_merge": (phone_merge_reference, True),
+    "pipe": (pipeline_reference, True),
+}
+
+# Engines running several jobs per call, their time is divided by the number
+# of jobs so that the speedup compares one job with one reference run
+BATCH_JOBS: Dict[Tuple[str, str], int] = {("pipe", "shared_memory"): 3}
+
+
+def engines(workers: int) -> List[Engine]:
+    found: List[Engine] = []
+    for backend in kernels.available_backends():
+        found += [
+            (
+                "fill_cam",
+                f"rows[{backend}]",
+                _with_backend(backend, _fill_rows),
+                False,
+                True,
+            ),
+            (
+                "fill_cam",
+                f"compact[{backend}]",
+                _with_backend(backend, _fill_compact),
+                True,
+                True,
+            ),
+            (
+                "resample_sensor",
+                f"arrays[{backend}]",
+                _with_backend(backend, _dedup_arrays),
+                False,
+                True,
+            ),
+            (
+                "resample_sensor",
+                f"compact[{backend}]",
+                _with_backend(backend, _dedup_compact),
+                True,
+                True,
+            ),
+        ]
+    found += [
+        ("resample_sensor", "streaming", _dedup_streaming, False, True),
+        ("resample_freq", "chunked", _resample_chunked(workers), False, False),
+        ("resample_freq", "compact", _resample_with(compact=True), True, True),
+        (
+            "resample_rounded",
+            "compact",
+            _resample_with("fractional_csv", compact=True),
+            True,
+            True,
+        ),
+        ("resample_gaps", "serial", _resample_gaps, False, True),
+        ("resample_gaps", "chunked", _resample_chunked(workers, True), False, False),
+        ("phone_resample", "streaming", _phone_resample_streaming, False, True),
+        ("phone_merge", "streaming", _phone_merge_streaming, False, True),
+        ("pipe", "fill_proc", _fill_proc, False, True),
+        ("pipe", "shared_memory", _shared_batch(workers), False, False),
+        ("pipe", "compact", _fill_proc_compact, True, True),
+    ]
+    return found
+
+
+def measure(
+    func: Callable, inputs: dict, work_dir: Path, repeats: int, traced: bool
+) -> Tuple[Tuple[np.ndarray, ...], float, Optional[int]]:
+    # One warm-up run (JIT compilation, file cache), best wall time of a few
+    # runs, then one traced run for the peak memory
+    result = func(inputs, work_dir)
+    seconds = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(inputs, work_dir)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    if not traced:
+        return result, seconds, None
+
+    tracemalloc.start()
+    try:
+        func(inputs, work_dir)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def compare(
+    reference: Tuple[np.ndarray, ...],
+    candidate: Tuple[np.ndarray, ...],
+    rtol: float,
+    atol: float,
+) -> Tuple[bool, float]:
+    # NaNs must be in the same places, everything else within tolerance
+    ok = len(reference) == len(candidate)
+    max_diff = 0.0
+    for expected, actual in zip(reference, candidate):
+        expected = np.asarray(expected, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        if expected.shape != actual.shape:
+            return False, float("inf")
+        if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+            return False, float("inf")
+
+        both = ~np.isnan(expected)
+        diff = np.abs(actual[both] - expected[both])
+        if diff.size:
+            max_diff = max(max_diff, float(diff.max()))
+        ok &= bool(np.all(diff <= atol + rtol * np.abs(expected[both])))
+
+    return ok, max_diff
+
+
+def run(args: argparse.Namespace, inputs: dict, work_dir: Path) -> List[dict]:
+    results = []
+    references = {
+        stage: measure(func, inputs, work_dir, args.repeats, traced)
+        for stage, (func, traced) in REFERENCES.items()
+    }
+
+    for stage, name, func, compact, traced in engines(args.workers):
+        reference, reference_seconds, reference_peak = references[stage]
+        result, seconds, peak = measure(func, inputs, work_dir, args.repeats, traced)
+        seconds /= BATCH_JOBS.get((stage, name), 1)
+        ok, max_diff = compare(
+            reference,
+            result,
+            rtol=args.compact_rtol if compact else args.rtol,
+            atol=args.compact_atol if compact else args.atol,
+        )
+        results.append(
+            {
+                "stage": stage,
+                "engine": name,
+                "ok": ok,
+                "max_diff": max_diff,
+                "seconds": seconds,
+                "reference_seconds": reference_seconds,
+                "speedup": reference_seconds / seconds,
+                "memory_ratio": (
+                    peak / reference_peak if peak and reference_peak else None
+                ),
+            }
+        )
+
+    return results
+
+
+def regressions(
+    results: List[dict],
+    baseline: Optional[Dict[str, dict]],
+    min_speedup: float,
+    max_slowdown: float,
+) -> List[str]:
+    failures = []
+    for result in results:
+        key = f"{result['stage']}/{result['engine']}"
+        if not result["ok"]:
+            failures.append(
+                f"{key}: output differs (max diff {result['max_diff']:.3e})"
+            )
+        if result["speedup"] < min_speedup:
+            failures.append(
+                f"{key}: speedup {result['speedup']:.2f}x below {min_speedup:.2f}x"
+            )
+
+        previous = (baseline or {}).get(key)
+        if previous is None:
+            continue
+        if result["speedup"] < previous["speedup"] * (1.0 - max_slowdown):
+            failures.append(
+                f"{key}: speedup {result['speedup']:.2f}x, "
+                f"was {previous['speedup']:.2f}x in the baseline"
+            )
+        if (
+            result["memory_ratio"] is not None
+            and previous.get("memory_ratio") is not None
+            and result["memory_ratio"] > previous["memory_ratio"] * (1.0 + max_slowdown)
+        ):
+            failures.append(
+                f"{key}: memory ratio {result['memory_ratio']:.2f}, "
+                f"was {previous['memory_ratio']:.2f} in the baseline"
+            )
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check faster engines against the reference scripts."
+    )
+    parser.add_argument(
+        "--inputs",
+        nargs=5,
+        metavar=("CAMERA_CSV", "IMU_CSV", "SENSOR_CSV", "TIME_COL", "SENSOR_COLS"),
+        help="real recordings instead of synthetic ones; IMU columns are read "
+        "from the IMU header",
+    )
+    parser.add_argument(
+        "--phone",
+        nargs="+",
+        type=Path,
+        metavar="PHONE_CSV",
+        help="phone sensor files merged and resampled together (with --inputs, "
+        "defaults to SENSOR_CSV)",
+    )
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument(
+        "--max-gap-ms",
+        type=float,
+        default=100.0,
+        help="dropout threshold of the resample_gaps stage",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rtol", type=float, default=1e-12)
+    parser.add_argument("--atol", type=float, default=1e-9)
+    parser.add_argument("--compact-rtol", type=float, default=1e-5)
+    parser.add_argument("--compact-atol", type=float, default=1e-5)
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=0.0,
+        help="fail below this speedup. Off (0) by default: speedups depend on "
+        "the machine (the chunked and batch engines need several CPUs), only "
+        "output mismatches and regressions against --baseline fail",
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=0.25,
+        help="fail when speedup drops (or memory grows) by more than this "
+        "fraction compared to the baseline",
+    )
+    parser.add_argument("--baseline", type=Path, help="results of a previous run")
+    parser.add_argument("--save", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = Path(tmp_dir)
+        if args.inputs:
+            camera_csv, imu_csv, sensor_csv, time_col, sensor_cols = args.inputs
+            # pipe.py runs from this directory, paths must not be relative
+            inputs = {
+                "camera_csv": Path(camera_csv).resolve(),
+                "imu_csv": Path(imu_csv).resolve(),
+                "imu_cols": merge_phone.file_value_cols(Path(imu_csv), time_col),
+                "sensor_csv": Path(sensor_csv).resolve(),
+                "sensor_cols": sensor_cols.split(","),
+                "phone_csvs": [
+                    Path(phone_csv).resolve()
+                    for phone_csv in args.phone or [sensor_csv]
+                ],
+                "fractional_csv": Path(sensor_csv).resolve(),
+                "time_col": time_col,
+            }
+        else:
+            inputs = synthetic_inputs(work_dir, args.seconds)
+            if args.phone:
+                inputs["phone_csvs"] = [phone_csv.resolve() for phone_csv in args.phone]
+        inputs["max_gap_ms"] = args.max_gap_ms
+        # Read once here, the headers are not part of what the engines time
+        inputs["phone_cols"] = merge_phone.sensor_fieldnames(
+            inputs["phone_csvs"], inputs["time_col"]
+        )[1:]
+
+        results = run(args, inputs, work_dir)
+
+    print(
+        f"{'stage':<16} {'engine':<16} {'ok':<4} {'max diff':>10} "
+        f"{'time (s)':>10} {'speedup':>8} {'memory':>8}"
+    )
+    for result in results:
+        memory = (
+            f"{result['memory_ratio']:.2f}x"
+            if result["memory_ratio"] is not None
+            else "-"
+        )
+        print(
+            f"{result['stage']:<16} {result['engine']:<16} "
+            f"{'yes' if result['ok'] else 'NO':<4} {result['max_diff']:>10.2e} "
+            f"{result['seconds']:>10.4f} {result['speedup']:>7.2f}x {memory:>8}"
+        )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with args.save.open("w", encoding="utf-8") as save_file:
+            json.dump(
+                {f"{r['stage']}/{r['engine']}": r for r in results}, save_file, indent=2
+            )
+
+    baseline = None
+    if args.baseline:
+        with args.baseline.open("r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    failures = regressions(results, baseline, args.min_speedup, args.max_slowdown)
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
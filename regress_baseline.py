@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import csv
+import pandas as pd
+import numpy as np
+
+from scipy import interpolate
+from typing import List, Tuple
+from pathlib import Path
+
+# Frozen copies of the camera filling, duplicate removal, resampling and
+# pipe.py as they were before the optimisation work (commit c062e46). They are
+# the references of regress.py: the live modules are checked against them, so
+# they must not change along with the live modules.
+
+
+def open_csv(file_path: Path) -> csv.DictReader:
+    if not file_path.exists():
+        raise FileNotFoundError(f"File {file_path} does not exist.")
+    if not file_path.is_file():
+        raise IsADirectoryError(f"{file_path} is a directory, not a file.")
+
+    return csv.DictReader(file_path.open("r", encoding="utf-8"))
+
+
+def fill_cam_gaps(csv: csv.DictReader, time_col: str, gap_threshold_ms: float) -> list:
+    filled_rows = []
+    last_row = None
+
+    for row in csv:
+        if last_row is not None:
+            delta = float(row[time_col]) - float(last_row[time_col])
+            # Ideally it should be 1 / 30 Hz = 33.33 ms
+            # If the gap is larger than the threshold, we fill it with the last row's
+            # timestamp incremented by half the gap size
+            if delta > gap_threshold_ms:
+                last_row_copy = last_row.copy()
+                last_row_copy[time_col] = str(int(float(last_row[time_col]) + delta / 2.0))
+                filled_rows.append(last_row_copy)
+        filled_rows.append(row)
+        last_row = row
+
+    return filled_rows
+
+
+def remove_sensor_duplicates(
+    csv_reader_source: csv.DictReader,
+    time_col: str,
+) -> List[dict]:
+    # Extract source data
+    source_rows = list(csv_reader_source)
+
+    # Use pandas to handle duplicates
+    df = pd.DataFrame(source_rows)
+
+    df[time_col] = pd.to_numeric(df[time_col], errors="coerce")
+
+    for col in df.columns:
+        if col != time_col:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    res = df.groupby(time_col).mean().reset_index()
+
+    return res.to_dict(orient="records")
+
+
+def resample_signal_from_csv(
+    csv_reader_source: csv.DictReader,
+    csv_reader_target: csv.DictReader,
+    source_time_col: str,
+    source_value_cols: List[str],
+    target_time_col: str,
+    interpolation_method: str = "linear",
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Extract target data
+    target_rows = list(csv_reader_target)
+    target_timestamps = np.array([float(row[target_time_col]) for row in target_rows])
+
+    # Extract source data
+    source_rows = list(csv_reader_source)
+    source_timestamps = np.array([float(row[source_time_col]) for row in source_rows])
+    source_values = np.array(
+        [[float(row[col]) for col in source_value_cols] for row in source_rows]
+    )
+
+    # Resample each source value column
+    interp_func = interpolate.interp1d(
+        source_timestamps,
+        source_values,
+        axis=0,  # Interpolate along the columns (values)
+        kind=interpolation_method,
+        bounds_error=False,
+        assume_sorted=False,
+    )
+
+    return interp_func(target_timestamps), target_timestamps
+
+
+def pipe(
+    camera_csv: Path,
+    data_csv: Path,
+    time_col: str,
+    data_cols: List[str],
+    output_cam_csv: Path,
+    output_data_csv: Path,
+    interpolation_method: str = "linear",
+) -> None:
+    # pipe.py, callable in process so that regress.py times it like the
+    # engines
+
+    # Fill gaps in camera data
+    filled_camera_rows = fill_cam_gaps(
+        open_csv(camera_csv),
+        time_col,
+        gap_threshold_ms=40.0,
+    )
+
+    # Write filled camera data to output CSV
+    output_cam_csv.parent.mkdir(parents=True, exist_ok=True)
+
+    with output_cam_csv.open("w", newline="", encoding="utf-8") as csvfile:
+        fieldnames = filled_camera_rows[0].keys()
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for filled_row in filled_camera_rows:
+            writer.writerow(filled_row)
+
+    # If the target CSV is an IMU, remove duplicates
+    if "imu" in data_csv.stem.lower():
+        resampled_data = remove_sensor_duplicates(
+            open_csv(data_csv),
+            time_col,
+        )
+
+        # Write resampled data to output CSV
+        temp_csv = output_data_csv.with_suffix(".temp.csv")
+        temp_csv.parent.mkdir(parents=True, exist_ok=True)
+        with temp_csv.open("w", newline="", encoding="utf-8") as csvfile:
+            fieldnames = resampled_data[0].keys()
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(resampled_data)
+
+        data_csv = temp_csv  # Update data_csv to the resampled output
+
+    # Resample sensor data based on filled camera timestamps
+    output_data_csv.parent.mkdir(parents=True, exist_ok=True)
+    with output_data_csv.open("w", newline="", encoding="utf-8") as csvfile:
+        fieldnames = [time_col] + data_cols
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for resampled_values, target_timestamps in zip(
+            *resample_signal_from_csv(
+                open_csv(data_csv),
+                open_csv(output_cam_csv),
+                source_time_col=time_col,
+                source_value_cols=data_cols,
+                target_time_col=time_col,
+                interpolation_method=interpolation_method,
+            )
+        ):
+            row = {time_col: target_timestamps}
+            for col, value in zip(data_cols, resampled_values):
+                row[col] = value
+            writer.writerow(row)
+
+    if "imu" in data_csv.stem.lower():
+        temp_csv.unlink()  # type: ignore
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 7:
+        print(
+            "Usage: regress_baseline.py <camera_csv> <data_csv> <time_col> <data_cols> <output_cam_csv> <output_data_csv> [interpolation_method]"
+        )
+        sys.exit(1)
+
+    pipe(
+        Path(sys.argv[1]),
+        Path(sys.argv[2]),
+        sys.argv[3],
+        sys.argv[4].split(","),
+        Path(sys.argv[5]),
+        Path(sys.argv[6]),
+        sys.argv[7] if len(sys.argv) > 7 else "linear",
+    )
+    sys.exit(0)
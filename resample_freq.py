@@ -2,14 +2,32 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import os
 
 import numpy as np
 from scipy import interpolate
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 import common
+import kernels
+import resample_sensor
+import seek_index
+import shared_arrays
+
+# Piecewise cubic kernels evaluated from the neighbourhood of each target
+# timestamp only, instead of interp1d's global spline
+LOCAL_KERNELS = ("catmull_rom", "pchip", "akima")
+
+# Targets interpolated together by the local kernels, small enough for the
+# temporaries of a block to stay in cache
+_TARGET_BLOCK = 2048
+
+# Interpolation kinds whose value at a target timestamp only depends on the
+# neighbouring source samples. Only these can be resampled chunk by chunk.
+LOCAL_KINDS = ("linear", "nearest", "previous", "next") + LOCAL_KERNELS
 
 
 def resample_signal(
@@ -31,6 +49,652 @@ def resample_signal(
     return resampled_values
 
 
+def read_timestamps(
+    csv_reader: csv.DictReader, time_col: str, compact: bool = False
+) -> np.ndarray:
+    return common.to_timestamps((row[time_col] for row in csv_reader), compact)
+
+
+def read_signal(
+    csv_reader: csv.DictReader,
+    time_col: str,
+    value_cols: List[str],
+    compact: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    timestamps, values = _parse_signal(list(csv_reader), time_col, value_cols, compact)
+
+    if compact:
+        # Samples less than a ms apart would share their rounded timestamp
+        return resample_sensor.to_compact(timestamps, values)
+
+    return timestamps, values
+
+
+def _parse_signal(
+    rows: List[dict], time_col: str, value_cols: List[str], compact: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Full precision timestamps, values already in their compact dtype
+    timestamps = common.to_timestamps(row[time_col] for row in rows)
+    values = np.array(
+        [[float(row[col]) for col in value_cols] for row in rows],
+        dtype=common.VALUE_DTYPE if compact else float,
+    )
+
+    return timestamps, values
+
+
+def _pchip_edge(h0: float, h1: float, m0: np.ndarray, m1: np.ndarray) -> np.ndarray:
+    # One-sided three-point estimate, shape preserving (same as scipy's pchip)
+    d = ((2.0 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+
+    d = np.where(np.sign(d) != np.sign(m0), 0.0, d)
+    overshoot = (np.sign(m0) != np.sign(m1)) & (np.abs(d) > 3.0 * np.abs(m0))
+
+    return np.where(overshoot, 3.0 * m0, d)
+
+
+def _knot_derivatives(kernel: str, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Derivative at every sample as if x, y were the whole signal. y holds one
+    # value column per row, so that everything depending on x alone
+    # broadcasts along the rows. Computed on shifted slices, in place where
+    # possible.
+    n = len(x)
+    h = np.diff(x)
+
+    if n == 2:
+        # Not enough samples for the kernel, fall back to the secant
+        m = (y[:, 1:] - y[:, :1]) / h
+        return np.concatenate([m, m], axis=1)
+
+    if kernel == "catmull_rom":
+        # Central difference, one-sided at the ends
+        d = np.empty_like(y)
+        np.subtract(y[:, 2:], y[:, :-2], out=d[:, 1:-1])
+        d[:, 1:-1] /= x[2:] - x[:-2]
+        d[:, 0] = (y[:, 1] - y[:, 0]) / h[0]
+        d[:, -1] = (y[:, -1] - y[:, -2]) / h[-1]
+        return d
+
+    if kernel == "pchip":
+        m = np.diff(y, axis=1)
+        m *= 1.0 / h
+        ml = m[:, :-1]
+        mr = m[:, 1:]
+        hl = h[:-1]
+        hr = h[1:]
+
+        # Weighted harmonic mean (w1 + w2) / (w1 / ml + w2 / mr) of the two
+        # slopes with a single division, zero at local extrema and next to
+        # flat intervals
+        d = np.empty_like(y)
+        inner = d[:, 1:-1]
+        np.multiply(ml, mr, out=inner)
+        extremum = ~(inner > 0.0)
+        denominator = (2.0 * hr + hl) * mr
+        denominator += (hr + 2.0 * hl) * ml
+        inner *= 3.0 * (hl + hr)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inner /= denominator
+        np.putmask(inner, extremum, 0.0)
+
+        # First and last knots only see the intervals on one side
+        d[:, 0] = _pchip_edge(h[0], h[1], m[:, 0], m[:, 1])
+        d[:, -1] = _pchip_edge(h[-1], h[-2], m[:, -1], m[:, -2])
+        return d
+
+    # akima: interval slopes with two more on each side, extended the way
+    # Akima does it: m[-1] = 2 m[0] - m[1], m[-2] = 3 m[0] - 2 m[1], same on
+    # the right. Knot k sits between m[k - 1] and m[k], at k + 1 and k + 2.
+    m = np.empty((len(y), n + 3))
+    np.subtract(y[:, 1:], y[:, :-1], out=m[:, 2:-2])
+    m[:, 2:-2] *= 1.0 / h
+    m[:, 1] = 2.0 * m[:, 2] - m[:, 3]
+    m[:, 0] = 3.0 * m[:, 2] - 2.0 * m[:, 3]
+    m[:, -2] = 2.0 * m[:, -3] - m[:, -4]
+    m[:, -1] = 3.0 * m[:, -3] - 2.0 * m[:, -4]
+    m_1 = m[:, 1:-2]
+    m0 = m[:, 2:-1]
+
+    # The weights |m[k + 1] - m[k]| and |m[k - 1] - m[k - 2]| of a knot are
+    # the same differences, two knots apart
+    weights = np.abs(np.diff(m, axis=1))
+    f1 = weights[:, 2:]
+    f2 = weights[:, :-2]
+    f12 = f1 + f2
+
+    d = f1 * m_1
+    d += f2 * m0
+    # Where both weights vanish the neighbourhood is locally linear
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d /= f12
+    flat = f12 == 0.0
+    if flat.any():
+        d[flat] = 0.5 * (m_1[flat] + m0[flat])
+    return d
+
+
+def _hermite_block(
+    kernel: str, x: np.ndarray, y: np.ndarray, t: np.ndarray, i: np.ndarray
+) -> np.ndarray:
+    # Cubic Hermite on [x[i], x[i + 1]] for time ordered targets t. The knot
+    # derivatives are computed from the first to the last interval used, with
+    # a margin of two samples for the kernels' stencils.
+    lo = max(int(i[0]) - 2, 0)
+    hi = min(int(i[-1]) + 4, len(x))
+    window = np.ascontiguousarray(y[lo:hi].T)
+    d = _knot_derivatives(kernel, x[lo:hi], window)
+
+    # y0 + s (a + s (c2 + s c3)) in the interval's own units, s in [0, 1]:
+    # a = h d0, b = h d1, c3 = a + b - 2 (y1 - y0), c2 = (y1 - y0) - a - c3
+    j = i - lo
+    h = x[i + 1] - x[i]
+    s = (t - x[i]) / h
+    y0 = np.take(window, j, axis=1)
+    a = np.take(d, j, axis=1)
+    a *= h
+    c3 = np.take(d, j + 1, axis=1)
+    c3 *= h
+    c2 = np.take(window, j + 1, axis=1)
+    c2 -= y0
+    c3 += a
+    c3 -= c2
+    c3 -= c2
+    c2 -= a
+    c2 -= c3
+
+    values = c3
+    values *= s
+    values += c2
+    values *= s
+    values += a
+    values *= s
+    values += y0
+
+    return values.T
+
+
+def resample_signal_local(
+    source_timestamps: np.ndarray,
+    source_values: np.ndarray,
+    target_timestamps: np.ndarray,
+    kernel: str = "catmull_rom",
+    assume_sorted: bool = False,
+    bracket: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    # bracket: kernels.bracket() of the sorted source and the targets, when
+    # the caller already has it
+    if kernel not in LOCAL_KERNELS:
+        raise ValueError(
+            f"Unknown kernel {kernel!r}, expected one of {', '.join(LOCAL_KERNELS)}."
+        )
+
+    x = np.asarray(source_timestamps, dtype=float)
+    y = np.asarray(source_values, dtype=float)
+    t = np.asarray(target_timestamps, dtype=float)
+    if not assume_sorted and not is_sorted(x):
+        # Sort with the same stable sort interp1d uses
+        order = np.argsort(x, kind="mergesort")
+        x = x[order]
+        y = y[order]
+
+    # Same checks as scipy's interpolators, instead of NaNs or an IndexError
+    if len(x) < 2:
+        raise ValueError(
+            f"{kernel} interpolation needs at least 2 source samples, got {len(x)}."
+        )
+    if not np.all(x[1:] > x[:-1]):
+        raise ValueError(
+            "Source timestamps must be strictly increasing, merge the duplicates "
+            "first (see resample_sensor.merge_sensor_duplicates)."
+        )
+
+    # All value columns are interpolated in one go
+    columns = y.reshape(len(x), -1)
+    if bracket is None:
+        bracket = kernels.bracket(x, t)
+    i = np.clip(bracket - 1, 0, len(x) - 2)
+
+    # Targets are handled a block at a time, in time order, so the knots of a
+    # block are a short run of the source and every temporary stays in cache
+    order = None if is_sorted(i) else np.argsort(i, kind="stable")
+    resampled_values = np.empty((len(t), columns.shape[1]))
+    for start in range(0, len(t), _TARGET_BLOCK):
+        block = slice(start, start + _TARGET_BLOCK)
+        rows = block if order is None else order[block]
+        resampled_values[rows] = _hermite_block(kernel, x, columns, t[rows], i[rows])
+
+    # Same as interp1d with bounds_error=False, NaN outside the source
+    outside = (t < x[0]) | (t > x[-1])
+    resampled_values[outside] = np.nan
+
+    return resampled_values.reshape((len(t),) + y.shape[1:])
+
+
+def _resample_linear(
+    source_timestamps: np.ndarray,
+    source_values: np.ndarray,
+    target_timestamps: np.ndarray,
+    bracket: np.ndarray,
+) -> np.ndarray:
+    # interp1d(kind="linear", bounds_error=False) on strictly increasing
+    # source timestamps, reusing an existing kernels.bracket(). Same indices,
+    # dtypes and operations as interp1d, so the results are identical.
+    x = source_timestamps
+    y = source_values
+    if not np.issubdtype(y.dtype, np.inexact):
+        y = y.astype(np.float64)
+    t = target_timestamps
+    if not np.issubdtype(t.dtype, np.inexact):
+        t = t.astype(np.float64)
+    n = len(x)
+
+    # interp1d searches with side="left", which only differs from the
+    # bracket for targets falling exactly on a sample
+    on_sample = (bracket > 0) & (x[np.clip(bracket - 1, 0, n - 1)] == t)
+    hi = np.clip(bracket - on_sample, 1, n - 1)
+    lo = hi - 1
+
+    columns = y.reshape(n, -1)
+    x_lo = x[lo]
+    y_lo = columns[lo]
+    slope = (columns[hi] - y_lo) / (x[hi] - x_lo)[:, None]
+    resampled_values = slope * (t - x_lo)[:, None] + y_lo
+    resampled_values[(t < x[0]) | (t > x[-1])] = np.nan
+
+    return resampled_values.reshape((len(t),) + y.shape[1:])
+
+
+def resample_values(
+    source_timestamps: np.ndarray,
+    source_values: np.ndarray,
+    target_timestamps: np.ndarray,
+    interpolation_method: str,
+    assume_sorted: bool = False,
+    bracket: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    # assume_sorted skips the sort for sources already in time order, the
+    # result is the same either way. A bracket (kernels.bracket() of the
+    # sorted source and the targets) is reused where the method allows it.
+    if interpolation_method in LOCAL_KERNELS:
+        resampled_values = resample_signal_local(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            kernel=interpolation_method,
+            assume_sorted=assume_sorted,
+            bracket=bracket,
+        )
+    elif (
+        interpolation_method == "linear"
+        and len(source_timestamps) > 1
+        and np.all(source_timestamps[1:] > source_timestamps[:-1])
+    ):
+        # Deduplicated, time ordered sources (the usual case) skip interp1d's
+        # sort and search
+        if bracket is None:
+            bracket = kernels.bracket(source_timestamps, target_timestamps)
+        resampled_values = _resample_linear(
+            source_timestamps, source_values, target_timestamps, bracket
+        )
+    else:
+        interp_func = interpolate.interp1d(
+            source_timestamps,
+            source_values,
+            axis=0,  # Interpolate along the columns (values)
+            kind=interpolation_method,
+            bounds_error=False,
+            assume_sorted=assume_sorted,
+        )
+        resampled_values = interp_func(target_timestamps)
+
+    # Computed in double precision, returned in the precision of the source
+    # (float32 in compact mode)
+    return resampled_values.astype(
+        np.promote_types(source_values.dtype, common.VALUE_DTYPE), copy=False
+    )
+
+
+def is_sorted(timestamps: np.ndarray) -> bool:
+    return bool(np.all(timestamps[1:] >= timestamps[:-1]))
+
+
+def _resample_chunk(
+    time_ref: shared_arrays.SharedArrayRef,
+    value_ref: shared_arrays.SharedArrayRef,
+    lo: int,
+    hi: int,
+    target_timestamps: np.ndarray,
+    interpolation_method: str,
+) -> np.ndarray:
+    source_timestamps, time_segment = shared_arrays.attach(time_ref)
+    source_values, value_segment = shared_arrays.attach(value_ref)
+    try:
+        return resample_values(
+            source_timestamps[lo:hi],
+            source_values[lo:hi],
+            target_timestamps,
+            interpolation_method,
+            assume_sorted=True,
+        )
+    finally:
+        # Views must be gone before the segments can be closed
+        del source_timestamps, source_values
+        time_segment.close()
+        value_segment.close()
+
+
+def resample_signal_chunked(
+    source_timestamps: np.ndarray,
+    source_values: np.ndarray,
+    target_timestamps: np.ndarray,
+    interpolation_method: str = "linear",
+    workers: Optional[int] = None,
+    overlap: int = 3,
+) -> np.ndarray:
+    if interpolation_method not in LOCAL_KINDS:
+        raise ValueError(
+            f"Chunked resampling only supports {', '.join(LOCAL_KINDS)}, "
+            f"got {interpolation_method!r}."
+        )
+
+    workers = workers or os.cpu_count() or 1
+    n_chunks = min(workers, len(target_timestamps))
+    if n_chunks < 2:
+        return resample_values(
+            source_timestamps, source_values, target_timestamps, interpolation_method
+        )
+
+    # Sort once here (same stable sort interp1d uses) so that every chunk can
+    # be handed a contiguous slice of the source. Recordings are almost
+    # always in time order already, then the sort is skipped.
+    if not is_sorted(source_timestamps):
+        order = np.argsort(source_timestamps, kind="mergesort")
+        source_timestamps = source_timestamps[order]
+        source_values = source_values[order]
+
+    with shared_arrays.SharedArrays() as shared:
+        # The source is copied once into shared memory, each chunk only gets
+        # the bounds of its slice instead of a pickled copy
+        time_ref = shared.share(source_timestamps)
+        value_ref = shared.share(source_values)
+
+        args = []
+        for target_chunk in np.array_split(target_timestamps, n_chunks):
+            if len(target_chunk) == 0:
+                continue
+            # Keep a few samples on each side so the bracketing samples of the
+            # chunk's first and last target are the same as in the full signal
+            lo = np.searchsorted(source_timestamps, target_chunk.min(), side="left")
+            hi = np.searchsorted(source_timestamps, target_chunk.max(), side="right")
+            lo = max(lo - overlap, 0)
+            hi = min(hi + overlap, len(source_timestamps))
+            args.append(
+                (time_ref, value_ref, lo, hi, target_chunk, interpolation_method)
+            )
+
+        kernels.warm_up()
+        with ProcessPoolExecutor(max_workers=n_chunks) as executor:
+            chunks = list(executor.map(_resample_chunk, *zip(*args)))
+
+    return np.concatenate(chunks, axis=0)
+
+
+def _resample_csv_chunk(
+    source_csv: Path,
+    header: List[str],
+    offset: int,
+    rows: int,
+    trim: Tuple[bool, bool],
+    source_time_col: str,
+    source_value_cols: List[str],
+    target_timestamps: np.ndarray,
+    out_refs: Tuple[shared_arrays.SharedArrayRef, ...],
+    start: int,
+    interpolation_method: str,
+    compact: bool,
+    max_gap_ms: Optional[float],
+) -> None:
+    timestamps, values = _parse_signal(
+        seek_index.read_from(source_csv, header, offset, rows),
+        source_time_col,
+        source_value_cols,
+        compact,
+    )
+    if not is_sorted(timestamps):
+        raise ValueError(f"Timestamps of {source_csv} are not sorted.")
+    if compact:
+        timestamps, values = resample_sensor.to_compact(timestamps, values)
+
+    # The samples sharing the first (last) timestamp of the part may go on
+    # before (after) it, they are dropped rather than merged or interpolated
+    # incompletely. The part reaches far enough that they are not needed.
+    keep = np.ones(len(timestamps), dtype=bool)
+    if trim[0]:
+        keep &= timestamps != timestamps[0]
+    if trim[1]:
+        keep &= timestamps != timestamps[-1]
+
+    resampled_values, valid, distance = resample_signal_gaps(
+        timestamps[keep],
+        values[keep],
+        target_timestamps,
+        interpolation_method,
+        max_gap_ms=max_gap_ms,
+    )
+
+    end = start + len(target_timestamps)
+    segments = []
+    try:
+        for out_ref, result in zip(out_refs, (resampled_values, valid, distance)):
+            out, segment = shared_arrays.attach(out_ref, writeable=True)
+            segments.append(segment)
+            out[start:end] = result
+            del out
+    finally:
+        for segment in segments:
+            segment.close()
+
+
+def resample_csv_chunked(
+    source_csv: Path,
+    target_timestamps: np.ndarray,
+    source_time_col: str,
+    source_value_cols: List[str],
+    interpolation_method: str = "linear",
+    workers: Optional[int] = None,
+    compact: bool = False,
+    max_gap_ms: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Same as read_signal + resample_signal_gaps on the whole file, but every
+    # worker parses only the part of the source its targets need, found with
+    # the seek index, and writes its slice of the results in shared memory.
+    # Only works on time-ordered files with fewer than a stride of rows
+    # sharing a timestamp, falls back to the serial path when the index shows
+    # the file is not in time order.
+    if interpolation_method not in LOCAL_KINDS:
+        raise ValueError(
+            f"Chunked resampling only supports {', '.join(LOCAL_KINDS)}, "
+            f"got {interpolation_method!r}."
+        )
+
+    index = seek_index.load_index(source_csv, time_col=source_time_col)
+    times = np.array(index["times"])
+    workers = workers or os.cpu_count() or 1
+    n_chunks = min(workers, len(target_timestamps))
+    if n_chunks < 2 or index["rows"] == 0 or not is_sorted(times):
+        source_timestamps, source_values = read_signal(
+            common.open_csv(source_csv),
+            source_time_col,
+            source_value_cols,
+            compact,
+        )
+        return resample_signal_gaps(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            interpolation_method,
+            max_gap_ms=max_gap_ms,
+        )
+
+    stride = index["stride"]
+    n_rows = index["rows"]
+    n_targets = len(target_timestamps)
+    value_dtype = common.VALUE_DTYPE if compact else np.float64
+
+    with shared_arrays.SharedArrays() as shared:
+        out_refs = (
+            shared.allocate((n_targets, len(source_value_cols)), value_dtype),
+            shared.allocate((n_targets,), bool),
+            shared.allocate((n_targets,), np.float64),
+        )
+
+        args = []
+        start = 0
+        for target_chunk in np.array_split(target_timestamps, n_chunks):
+            # A whole stride of rows on each side of the chunk's targets, so
+            # the trimmed part still holds their neighbouring samples
+            first = max(np.searchsorted(times, target_chunk.min(), "left") - 2, 0)
+            last = np.searchsorted(times, target_chunk.max(), "right") + 1
+            lo = first * stride
+            hi = min(last * stride, n_rows)
+            args.append(
+                (
+                    source_csv,
+                    index["header"],
+                    index["offsets"][first],
+                    hi - lo,
+                    (lo > 0, hi < n_rows),
+                    source_time_col,
+                    source_value_cols,
+                    target_chunk,
+                    out_refs,
+                    start,
+                    interpolation_method,
+                    compact,
+                    max_gap_ms,
+                )
+            )
+            start += len(target_chunk)
+
+        kernels.warm_up()
+        with ProcessPoolExecutor(max_workers=n_chunks) as executor:
+            list(executor.map(_resample_csv_chunk, *zip(*args)))
+
+        # Copied out before the segments are released
+        return tuple(shared.view(out_ref).copy() for out_ref in out_refs)  # type: ignore
+
+
+def gap_mask(
+    source_timestamps: np.ndarray,
+    target_timestamps: np.ndarray,
+    max_gap_ms: Optional[float] = None,
+    bracket: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # For sorted source timestamps: whether each target is backed by real data
+    # and how far (in ms) it is from the nearest source sample. A target is
+    # invalid outside the source range and, with max_gap_ms, inside a dropout
+    # longer than max_gap_ms unless it falls exactly on a sample.
+    x = source_timestamps
+    t = target_timestamps
+    n = len(x)
+    if n == 0:
+        return np.zeros(len(t), dtype=bool), np.full(len(t), np.inf)
+
+    j = kernels.bracket(x, t) if bracket is None else bracket
+    previous = x[np.clip(j - 1, 0, n - 1)]
+    following = x[np.clip(j, 0, n - 1)]
+    distance = np.minimum(
+        np.where(j == 0, np.inf, t - previous),
+        np.where(j == n, np.inf, following - t),
+    )
+
+    valid = (t >= x[0]) & (t <= x[-1])
+    if max_gap_ms is not None:
+        valid &= (following - previous <= max_gap_ms) | (distance == 0)
+
+    return valid, distance
+
+
+def valid_segments(valid: np.ndarray) -> List[Tuple[int, int]]:
+    # (start, end) slices of the runs of valid targets
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], valid.astype(np.int8), [0]])))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def resample_signal_gaps(
+    source_timestamps: np.ndarray,
+    source_values: np.ndarray,
+    target_timestamps: np.ndarray,
+    interpolation_method: str = "linear",
+    max_gap_ms: Optional[float] = None,
+    workers: int = 1,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Values are NaN wherever the target is not valid, instead of being
+    # extrapolated or interpolated across a dropout
+    if not is_sorted(source_timestamps):
+        order = np.argsort(source_timestamps, kind="mergesort")
+        source_timestamps = source_timestamps[order]
+        source_values = source_values[order]
+
+    # One search of the targets in the source, shared by the mask and the
+    # serial interpolation
+    bracket = kernels.bracket(source_timestamps, target_timestamps)
+    valid, distance = gap_mask(
+        source_timestamps, target_timestamps, max_gap_ms, bracket=bracket
+    )
+
+    if workers > 1 and interpolation_method in LOCAL_KINDS:
+        resampled_values = resample_signal_chunked(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            interpolation_method=interpolation_method,
+            workers=workers,
+        )
+    else:
+        resampled_values = resample_values(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            interpolation_method,
+            assume_sorted=True,
+            bracket=bracket,
+        )
+    resampled_values[~valid] = np.nan
+
+    return resampled_values, valid, distance
+
+
+def resample_signal_gaps_from_csv(
+    csv_reader_source: csv.DictReader,
+    csv_reader_target: csv.DictReader,
+    source_time_col: str,
+    source_value_cols: List[str],
+    target_time_col: str,
+    interpolation_method: str = "linear",
+    workers: int = 1,
+    compact: bool = False,
+    max_gap_ms: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Resampled values and target timestamps, with the validity of each
+    # target and its distance (ms) to the nearest source sample
+    target_timestamps = read_timestamps(csv_reader_target, target_time_col, compact)
+    source_timestamps, source_values = read_signal(
+        csv_reader_source, source_time_col, source_value_cols, compact
+    )
+
+    resampled_values, valid, distance = resample_signal_gaps(
+        source_timestamps,
+        source_values,
+        target_timestamps,
+        interpolation_method=interpolation_method,
+        max_gap_ms=max_gap_ms,
+        workers=workers,
+    )
+
+    return resampled_values, target_timestamps, valid, distance
+
+
 def resample_signal_from_csv(
     csv_reader_source: csv.DictReader,
     csv_reader_target: csv.DictReader,
@@ -38,67 +702,123 @@ def resample_signal_from_csv(
     source_value_cols: List[str],
     target_time_col: str,
     interpolation_method: str = "linear",
+    workers: int = 1,
+    compact: bool = False,
+    max_gap_ms: Optional[float] = None,
+    only_valid: bool = False,
 ) -> Tuple[np.ndarray, np.ndarray]:
+    # NaN across dropouts longer than max_gap_ms, or drop those targets
+    if max_gap_ms is not None or only_valid:
+        resampled_values, target_timestamps, valid, _ = resample_signal_gaps_from_csv(
+            csv_reader_source,
+            csv_reader_target,
+            source_time_col,
+            source_value_cols,
+            target_time_col,
+            interpolation_method=interpolation_method,
+            workers=workers,
+            compact=compact,
+            max_gap_ms=max_gap_ms,
+        )
+        if only_valid:
+            return resampled_values[valid], target_timestamps[valid]
+        return resampled_values, target_timestamps
+
     # Extract target data
-    target_rows = list(csv_reader_target)
-    target_timestamps = np.array([float(row[target_time_col]) for row in target_rows])
+    target_timestamps = read_timestamps(csv_reader_target, target_time_col, compact)
 
     # Extract source data
-    source_rows = list(csv_reader_source)
-    source_timestamps = np.array([float(row[source_time_col]) for row in source_rows])
-    source_values = np.array(
-        [[float(row[col]) for col in source_value_cols] for row in source_rows]
+    source_timestamps, source_values = read_signal(
+        csv_reader_source, source_time_col, source_value_cols, compact
     )
 
+    # Split a single large source across processes
+    if workers > 1 and interpolation_method in LOCAL_KINDS:
+        resampled_values = resample_signal_chunked(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            interpolation_method=interpolation_method,
+            workers=workers,
+        )
+        return resampled_values, target_timestamps
+
     # Resample each source value column
-    interp_func = interpolate.interp1d(
-        source_timestamps,
-        source_values,
-        axis=0,  # Interpolate along the columns (values)
-        kind=interpolation_method,
-        bounds_error=False,
-        assume_sorted=False,
+    return (
+        resample_values(
+            source_timestamps,
+            source_values,
+            target_timestamps,
+            interpolation_method,
+        ),
+        target_timestamps,
     )
 
-    return interp_func(target_timestamps), target_timestamps
-
 
 if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 7:
         print(
-            "Usage: python resample_freq.py <source_csv> <target_csv> <source_time_col> <source_value_cols> <target_time_col> <output_csv> [interpolation_method]"
+            "Usage: python resample_freq.py <source_csv> <target_csv> <source_time_col> <source_value_cols> <target_time_col> <output_csv> [interpolation_method] [workers] [max_gap_ms] [only_valid]"
         )
         sys.exit(1)
 
-    source_csv = common.open_csv(Path(sys.argv[1]))
+    source_csv = Path(sys.argv[1])
     target_csv = common.open_csv(Path(sys.argv[2]))
     source_time_col = sys.argv[3]
     source_value_cols = sys.argv[4].split(",")
     target_time_col = sys.argv[5]
     output_csv = Path(sys.argv[6])
     interpolation_method = sys.argv[7] if len(sys.argv) > 7 else "linear"
+    workers = int(sys.argv[8]) if len(sys.argv) > 8 else 1
+    max_gap_ms = float(sys.argv[9]) if len(sys.argv) > 9 else None
+    only_valid = len(sys.argv) > 10 and sys.argv[10] == "only_valid"
 
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    with output_csv.open("w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = [target_time_col] + source_value_cols
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for resampled_values, target_timestamps in zip(
-            *resample_signal_from_csv(
-                source_csv,
+    # Validity and distance to the nearest real sample come with the values
+    if workers > 1 and interpolation_method in LOCAL_KINDS:
+        # Each worker parses its own part of the source file
+        target_timestamps = read_timestamps(target_csv, target_time_col)
+        resampled_values, valid, distance = resample_csv_chunked(
+            source_csv,
+            target_timestamps,
+            source_time_col,
+            source_value_cols,
+            interpolation_method=interpolation_method,
+            workers=workers,
+            max_gap_ms=max_gap_ms,
+        )
+    else:
+        resampled_values, target_timestamps, valid, distance = (
+            resample_signal_gaps_from_csv(
+                common.open_csv(source_csv),
                 target_csv,
                 source_time_col,
                 source_value_cols,
                 target_time_col,
                 interpolation_method=interpolation_method,
+                max_gap_ms=max_gap_ms,
             )
+        )
+    gap_cols = [] if max_gap_ms is None else ["valid", "gap_distance_ms"]
+
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    with output_csv.open("w", newline="", encoding="utf-8") as csvfile:
+        fieldnames = [target_time_col] + source_value_cols + gap_cols
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for values, timestamp, is_valid, gap_distance in zip(
+            resampled_values, target_timestamps, valid, distance
         ):
-            row = {target_time_col: target_timestamps}
-            for col, value in zip(source_value_cols, resampled_values):
+            if only_valid and not is_valid:
+                continue
+            row = {target_time_col: timestamp}
+            for col, value in zip(source_value_cols, values):
                 row[col] = value
+            if gap_cols:
+                row["valid"] = int(is_valid)
+                row["gap_distance_ms"] = gap_distance
             writer.writerow(row)
 
     print(f"Resampled data written to {output_csv}")
@@ -2,15 +2,18 @@
 # -*- coding: utf-8 -*
 
 import csv
+import math
 
+import numpy as np
 import pandas as pd
 
 
-from typing import List
+from typing import List, Tuple
 from pathlib import Path
 
 
 import common
+import kernels
 
 
 def remove_sensor_duplicates(
@@ -34,6 +37,66 @@ def remove_sensor_duplicates(
     return res.to_dict(orient="records")
 
 
+def read_sensor(
+    csv_reader_source: csv.DictReader,
+    time_col: str,
+    value_cols: List[str],
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Non numeric values become NaN and rows without a timestamp are dropped,
+    # like remove_sensor_duplicates does. Always in full precision, compact
+    # mode only applies once the duplicates are merged.
+    timestamps = []
+    values = []
+    for row in csv_reader_source:
+        timestamp = common.to_float(row[time_col])
+        if not math.isnan(timestamp):
+            timestamps.append(timestamp)
+            values.append([common.to_float(row[col]) for col in value_cols])
+
+    timestamps = np.array(timestamps)
+    values = np.array(values).reshape(len(timestamps), len(value_cols))
+
+    return timestamps, values
+
+
+def merge_sensor_duplicates(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Array version of remove_sensor_duplicates: sorted unique timestamps and
+    # the NaN-skipping mean of the rows sharing each of them, in float64
+    order = np.argsort(timestamps, kind="stable")
+
+    return kernels.dedup_mean(timestamps[order], values[order])
+
+
+def to_compact(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Timestamps rounded to whole ms and single precision values. Samples
+    # that land on the same ms once rounded are merged like duplicates, with
+    # the NaN-skipping mean of their values, so the result keeps strictly
+    # increasing timestamps.
+    rounded = np.rint(timestamps).astype(common.TIME_DTYPE)
+    if np.all(rounded[1:] > rounded[:-1]):
+        return rounded, values.astype(common.VALUE_DTYPE, copy=False)
+
+    unique_timestamps, means = merge_sensor_duplicates(rounded, values)
+
+    return unique_timestamps, means.astype(common.VALUE_DTYPE)
+
+
+def remove_sensor_duplicates_compact(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # merge_sensor_duplicates as compact arrays. Duplicates are merged on the
+    # full precision timestamps first, like in the float64 pipeline, then
+    # again on the rounded ones.
+    return to_compact(*merge_sensor_duplicates(timestamps, values))
+
+
 if __name__ == "__main__":
     import sys
 
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import bisect
+import csv
+import io
+import json
+
+from typing import BinaryIO, Iterator, List, Optional
+from pathlib import Path
+
+import common
+
+# A sidecar <file>.csv.idx keeps the byte offset (and the timestamp, when a
+# time column is indexed) of every DEFAULT_STRIDE-th data row, so a slice of a
+# recording can be read by seeking close to it and parsing only that part.
+# Rows are assumed to be one line each, which is the case for all our sensor
+# and camera files.
+DEFAULT_STRIDE = 1000
+
+
+def index_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + ".idx")
+
+
+def _data_lines(csv_file: BinaryIO) -> Iterator[bytes]:
+    # Blank lines are not rows, csv.DictReader skips them as well
+    for line in csv_file:
+        if line.strip():
+            yield line
+
+
+def build_index(
+    csv_path: Path, time_col: Optional[str] = None, stride: int = DEFAULT_STRIDE
+) -> dict:
+    common.check_csv(csv_path)
+    stat = csv_path.stat()
+
+    offsets = []
+    times = []
+    rows = 0
+    with csv_path.open("rb") as csv_file:
+        header = next(csv.reader([csv_file.readline().decode("utf-8")]))
+        time_idx = header.index(time_col) if time_col is not None else None
+
+        offset = csv_file.tell()
+        for line in csv_file:
+            if line.strip():
+                if rows % stride == 0:
+                    offsets.append(offset)
+                    if time_idx is not None:
+                        row = next(csv.reader([line.decode("utf-8")]))
+                        times.append(float(row[time_idx]))
+                rows += 1
+            offset += len(line)
+
+    index = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "stride": stride,
+        "header": header,
+        "rows": rows,
+        "time_col": time_col,
+        "offsets": offsets,
+        "times": times,
+    }
+
+    try:
+        with index_path(csv_path).open("w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+    except OSError:
+        # Read-only location, the index is only kept for this call
+        pass
+
+    return index
+
+
+def load_index(
+    csv_path: Path, time_col: Optional[str] = None, stride: int = DEFAULT_STRIDE
+) -> dict:
+    # Built on first access, rebuilt when the CSV changed or when the
+    # requested time column is not indexed yet
+    common.check_csv(csv_path)
+    stat = csv_path.stat()
+
+    try:
+        with index_path(csv_path).open("r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return build_index(csv_path, time_col, stride)
+
+    if (
+        index.get("size") != stat.st_size
+        or index.get("mtime_ns") != stat.st_mtime_ns
+        or index.get("stride") != stride
+        or (time_col is not None and index.get("time_col") != time_col)
+    ):
+        return build_index(csv_path, time_col, stride)
+
+    return index
+
+
+def _parse(header: List[str], lines: List[bytes]) -> List[dict]:
+    text = io.StringIO(b"".join(lines).decode("utf-8"), newline="")
+    return list(csv.DictReader(text, fieldnames=header))
+
+
+def read_from(
+    csv_path: Path, header: List[str], offset: int, count: int, skip: int = 0
+) -> List[dict]:
+    # count rows, starting skip rows after the one at byte offset (one of the
+    # index offsets). Only that part of the file is read, so several
+    # processes can each parse their own part of a recording.
+    if count <= 0:
+        return []
+
+    lines = []
+    with csv_path.open("rb") as csv_file:
+        csv_file.seek(offset)
+        for line in _data_lines(csv_file):
+            if skip:
+                skip -= 1
+                continue
+            lines.append(line)
+            if len(lines) == count:
+                break
+
+    return _parse(header, lines)
+
+
+def read_rows(
+    csv_path: Path, start: int, end: int, stride: int = DEFAULT_STRIDE
+) -> List[dict]:
+    # Same rows as list(common.open_csv(csv_path))[start:end]
+    index = load_index(csv_path, stride=stride)
+    rows = range(index["rows"])[start:end]
+    if len(rows) == 0:
+        return []
+
+    block, skip = divmod(rows.start, index["stride"])
+    return read_from(
+        csv_path, index["header"], index["offsets"][block], len(rows), skip
+    )
+
+
+def read_time_range(
+    csv_path: Path,
+    time_col: str,
+    start_time: float,
+    end_time: float,
+    stride: int = DEFAULT_STRIDE,
+) -> List[dict]:
+    # Rows with start_time <= time_col <= end_time, for files sorted by time
+    index = load_index(csv_path, time_col=time_col, stride=stride)
+    if index["rows"] == 0:
+        return []
+
+    time_idx = index["header"].index(time_col)
+    block = max(bisect.bisect_left(index["times"], start_time) - 1, 0)
+
+    lines = []
+    with csv_path.open("rb") as csv_file:
+        csv_file.seek(index["offsets"][block])
+        for line in _data_lines(csv_file):
+            timestamp = float(next(csv.reader([line.decode("utf-8")]))[time_idx])
+            if timestamp > end_time:
+                break
+            if timestamp >= start_time:
+                lines.append(line)
+
+    return _parse(index["header"], lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: seek_index.py <csv_file> [time_col] [stride]")
+        print("Example: seek_index.py imu_0_data_sync_fill.csv time_ms_loc 1000")
+        sys.exit(1)
+
+    csv_path = Path(sys.argv[1])
+    time_col = sys.argv[2] if len(sys.argv) > 2 else None
+    stride = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_STRIDE
+
+    index = build_index(csv_path, time_col, stride)
+    print(f"Indexed {index['rows']} rows every {stride} rows in {index_path(csv_path)}")
+    sys.exit(0)
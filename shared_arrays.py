@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+import numpy as np
+
+from typing import Dict, Tuple
+from multiprocessing import resource_tracker, shared_memory
+
+# (segment name, shape, dtype) - small and picklable, this is what gets sent
+# to the workers instead of the array itself
+SharedArrayRef = Tuple[str, Tuple[int, ...], str]
+
+
+class SharedArrays:
+    # Owns the shared memory segments of a batch. Segments are unlinked when
+    # the block exits, whatever happened in the workers. If the owning process
+    # itself dies, the multiprocessing resource tracker unlinks them.
+    def __init__(self):
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        # Workers started from now on share the owner's resource tracker.
+        # Before Python 3.13 attaching registers the segment with the tracker,
+        # a worker with a tracker of its own would unlink the segments when it
+        # exits.
+        resource_tracker.ensure_running()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def share(self, array: np.ndarray) -> SharedArrayRef:
+        segment, ref = _new_segment(array)
+        self._segments[segment.name] = segment
+
+        return ref
+
+    def adopt(self, ref: SharedArrayRef) -> SharedArrayRef:
+        # Takes over a segment a worker made with create(), it is unlinked
+        # with the others
+        if ref[0] in self._segments:
+            return ref
+
+        segment = shared_memory.SharedMemory(name=ref[0])
+        self._segments[segment.name] = segment
+
+        return ref
+
+    def allocate(self, shape: Tuple[int, ...], dtype) -> SharedArrayRef:
+        # Uninitialised segment for the workers to write their results into
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        segment = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._segments[segment.name] = segment
+
+        return segment.name, tuple(shape), dtype.str
+
+    def view(self, ref: SharedArrayRef) -> np.ndarray:
+        # The owner's view of one of its segments, valid until release()
+        name, shape, dtype = ref
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._segments[name].buf)
+
+    def release(self) -> None:
+        while self._segments:
+            _, segment = self._segments.popitem()
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _new_segment(
+    array: np.ndarray,
+) -> Tuple[shared_memory.SharedMemory, SharedArrayRef]:
+    array = np.ascontiguousarray(array)
+    # Zero sized segments are not allowed
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+    view[...] = array
+    del view
+
+    return segment, (segment.name, array.shape, array.dtype.str)
+
+
+def create(array: np.ndarray) -> SharedArrayRef:
+    # For a worker producing an array the owner shares: the array is written
+    # once, straight into a new segment, and only its reference goes back to
+    # the owner, which must adopt() it. Until then the resource tracker
+    # unlinks it if the owner dies.
+    segment, ref = _new_segment(array)
+    segment.close()
+
+    return ref
+
+
+def attach(
+    ref: SharedArrayRef, writeable: bool = False
+) -> Tuple[np.ndarray, shared_memory.SharedMemory]:
+    # writeable for the segments a worker fills (see SharedArrays.allocate)
+    name, shape, dtype = ref
+
+    # Workers only borrow the segment, the owner is the one unlinking it
+    if sys.version_info >= (3, 13):
+        segment = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        segment = shared_memory.SharedMemory(name=name)
+
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+    array.flags.writeable = writeable
+
+    return array, segment